@@ -16,6 +16,10 @@ class Settings(BaseSettings):
     anthropic_api_key: Optional[str] = None
     claude_model: str = "claude-3-5-sonnet-20241022"
 
+    # Cache des réponses LLM (SQLite) - désactivé par défaut
+    llm_cache_enabled: bool = False
+    llm_cache_path: Optional[str] = None
+
     # Celery Configuration - DB 1 pour éviter conflits
     celery_broker_url: str = "redis://localhost:6379/1"
     celery_result_backend: str = "redis://localhost:6379/1"
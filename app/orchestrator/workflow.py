@@ -1,5 +1,6 @@
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, List, Dict, Any, Optional
+from typing import TypedDict, List, Dict, Any, Optional, Tuple
+import asyncio
 import logging
 import uuid
 from datetime import datetime
@@ -103,52 +104,69 @@ class ContentPublisherOrchestrator:
         base_content = state["content_generated"]
         formatted_content = {}
 
-        # Formater pour chaque configuration plateforme/type
-        for config in request.platforms_config:
-            try:
-                # Valider que le compte existe
-                account = validate_account_exists(request.site_web, config.platform)
-                logger.info(f"Compte validé: {account.account_name} pour {request.site_web}/{config.platform}")
+        # Formater toutes les configurations plateforme/type en parallèle (appels LLM indépendants)
+        outcomes = await asyncio.gather(*(
+            self._format_config(request, config, base_content)
+            for config in request.platforms_config
+        ))
 
-                # Créer une clé unique pour cette combinaison plateforme/type
-                config_key = f"{config.platform.value}_{config.content_type.value}"
+        # Résultats et erreurs dans l'ordre des configurations
+        for config_key, formatted, error_msg in outcomes:
+            if error_msg:
+                state["errors"].append(error_msg)
+            else:
+                formatted_content[config_key] = formatted
 
-                # Utiliser les agents formatters spécialisés
-                if config.platform == PlatformType.TWITTER:
-                    formatted = await twitter_formatter.format_content(base_content, config, account)
-                    formatted_content[config_key] = formatted
+        state["formatted_content"] = formatted_content
+        state["current_step"] = "content_formatted"
 
-                elif config.platform == PlatformType.INSTAGRAM:
-                    formatted = await instagram_formatter.format_content(base_content, config, account)
-                    formatted_content[config_key] = formatted
+        return state
 
-                # TODO: Ajouter Facebook et LinkedIn formatters
-                elif config.platform == PlatformType.FACEBOOK:
-                    # Temporaire: formatage simple
-                    formatted_content[config_key] = {"message": f"[Facebook] {base_content}"}
+    async def _format_config(
+            self,
+            request: EnhancedPublicationRequest,
+            config: PlatformContentConfig,
+            base_content: str
+    ) -> Tuple[Optional[str], Any, Optional[str]]:
+        """Formate le contenu pour une configuration: (clé, contenu formaté, message d'erreur)"""
+        try:
+            # Valider que le compte existe
+            account = validate_account_exists(request.site_web, config.platform)
+            logger.info(f"Compte validé: {account.account_name} pour {request.site_web}/{config.platform}")
 
-                elif config.platform == PlatformType.LINKEDIN:
-                    # Temporaire: formatage simple
-                    formatted_content[config_key] = {"contenu": f"[LinkedIn] {base_content}"}
+            # Créer une clé unique pour cette combinaison plateforme/type
+            config_key = f"{config.platform.value}_{config.content_type.value}"
 
-                else:
-                    raise ValueError(f"Plateforme non supportée: {config.platform}")
+            # Utiliser les agents formatters spécialisés
+            if config.platform == PlatformType.TWITTER:
+                formatted = await twitter_formatter.format_content(base_content, config, account)
 
-                logger.info(f"Contenu formaté pour {config_key} (compte: {account.account_name})")
+            elif config.platform == PlatformType.INSTAGRAM:
+                formatted = await instagram_formatter.format_content(base_content, config, account)
 
-            except AccountValidationError as e:
-                error_msg = f"Erreur validation compte {config.platform}: {str(e)}"
-                logger.error(error_msg)
-                state["errors"].append(error_msg)
-            except Exception as e:
-                error_msg = f"Erreur formatage {config.platform}_{config.content_type}: {str(e)}"
-                logger.error(error_msg)
-                state["errors"].append(error_msg)
+            # TODO: Ajouter Facebook et LinkedIn formatters
+            elif config.platform == PlatformType.FACEBOOK:
+                # Temporaire: formatage simple
+                formatted = {"message": f"[Facebook] {base_content}"}
 
-        state["formatted_content"] = formatted_content
-        state["current_step"] = "content_formatted"
+            elif config.platform == PlatformType.LINKEDIN:
+                # Temporaire: formatage simple
+                formatted = {"contenu": f"[LinkedIn] {base_content}"}
 
-        return state
+            else:
+                raise ValueError(f"Plateforme non supportée: {config.platform}")
+
+            logger.info(f"Contenu formaté pour {config_key} (compte: {account.account_name})")
+            return config_key, formatted, None
+
+        except AccountValidationError as e:
+            error_msg = f"Erreur validation compte {config.platform}: {str(e)}"
+            logger.error(error_msg)
+            return None, None, error_msg
+        except Exception as e:
+            error_msg = f"Erreur formatage {config.platform}_{config.content_type}: {str(e)}"
+            logger.error(error_msg)
+            return None, None, error_msg
 
     async def _publish_content_node(self, state: WorkflowState) -> WorkflowState:
         """Nœud de publication utilisant les agents publishers avec respect du paramètre published"""
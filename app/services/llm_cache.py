@@ -0,0 +1,62 @@
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Cache persistant (SQLite) des réponses LLM, indexé par hash du prompt"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), "llm_cache.sqlite3")
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT NOT NULL)"
+            )
+        logger.info(f"💾 Cache LLM activé: {self.path}")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Connexion SQLite validée en sortie de bloc puis fermée"""
+        with contextlib.closing(sqlite3.connect(self.path)) as conn:
+            with conn:
+                yield conn
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], prompt: str, temperature: float) -> str:
+        """Calcule la clé SHA-256 de (modèle, prompt système, prompt, température)"""
+        payload = json.dumps([model, system_prompt or "", prompt, temperature], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, response: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response) VALUES (?, ?)", (key, response)
+            )
+
+    async def get(self, key: str) -> Optional[str]:
+        """Retourne la réponse en cache ou None"""
+        try:
+            return await asyncio.get_event_loop().run_in_executor(None, self._get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Lecture du cache LLM impossible: {e}")
+            return None
+
+    async def set(self, key: str, response: str) -> None:
+        """Enregistre une réponse dans le cache"""
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, self._set, key, response)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Écriture du cache LLM impossible: {e}")
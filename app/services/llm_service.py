@@ -2,15 +2,24 @@ from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
 from typing import Optional, Dict, Any
 import logging
+import sqlite3
 from app.config.settings import settings
+from app.services.llm_cache import LLMCache
 
 logger = logging.getLogger(__name__)
 
-
 class LLMService:
     """Service pour interagir avec Claude LLM"""
 
     def __init__(self):
+        self.temperature = 0.7
+        self.cache = None
+        if settings.llm_cache_enabled:
+            try:
+                self.cache = LLMCache(settings.llm_cache_path)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Cache LLM désactivé, base inaccessible: {e}")
+
         if not settings.anthropic_api_key:
             logger.warning("ANTHROPIC_API_KEY not provided - LLM service will be disabled")
             self.llm = None
@@ -19,8 +28,10 @@ class LLMService:
                 self.llm = ChatAnthropic(
                     anthropic_api_key=settings.anthropic_api_key,
                     model=settings.claude_model,
-                    temperature=0.7,
-                    max_tokens=1000
+                    temperature=self.temperature,
+                    max_tokens=1000,
+                    # Reprises du SDK (408/409/429/5xx, retry-after) limitées à l'appel fautif
+                    max_retries=settings.max_retry_attempts - 1
                 )
                 logger.info("LLM service initialized successfully")
             except Exception as e:
@@ -41,8 +52,19 @@ class LLMService:
 
             messages.append(HumanMessage(content=prompt))
 
+            cache_key = None
+            if self.cache:
+                cache_key = LLMCache.make_key(settings.claude_model, system_prompt, prompt, self.temperature)
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
             response = await self.llm.ainvoke(messages)
-            return response.content.strip()
+            content = response.content.strip()
+
+            if cache_key:
+                await self.cache.set(cache_key, content)
+            return content
 
         except Exception as e:
             logger.error(f"Erreur lors de la génération de contenu: {e}")
@@ -102,5 +124,6 @@ class LLMService:
         return await self.generate_content(content, system_prompt)
 
 
-# Instance globale du service LLM
+# Instance globale du service LLM : ChatAnthropic garde un seul client httpx (pool keep-alive),
+# partagé par tous les workflows du processus — ne pas instancier LLMService par requête
 llm_service = LLMService()
\ No newline at end of file
@@ -1,12 +1,56 @@
+import asyncio
+import io
 import logging
 import tempfile
+import hashlib
+import json
+import math
 import os
-from typing import Tuple, Optional, Dict, Any
+import sys
+import threading
+from collections import OrderedDict
+from typing import Tuple, Optional, Dict, Any, List, Union
 from PIL import Image
 import numpy as np
 
+try:
+    import cv2
+    # Un seul thread par opération: le parallélisme se fait au niveau des requêtes
+    cv2.setNumThreads(1)
+    _HAS_CV2 = True
+except ImportError:
+    cv2 = None
+    _HAS_CV2 = False
+
 logger = logging.getLogger(__name__)
 
+# Checkpoint SAM monté par docker-compose (volume sam_checkpoints)
+SAM_CHECKPOINT_PATH = os.getenv('SAM_CHECKPOINT_PATH', '/app/models/sam_checkpoints/sam_vit_b_01ec64.pth')
+
+# Résultat de la détection des méthodes, partagé entre les workers/redémarrages
+METHODS_CACHE_FILE = os.path.join(tempfile.gettempdir(), '.unified_cropper_methods.json')
+
+# Encodage des sorties: 4:2:0, baseline (les plateformes ré-encodent de toute façon)
+JPEG_SAVE_OPTIONS = {'quality': 90, 'subsampling': 2, 'progressive': False}
+
+# Nombre de crops encodés gardés en mémoire (LRU)
+CROP_CACHE_MAX_ENTRIES = 32
+
+# Dimensions cibles par plateforme et type de contenu
+PLATFORM_DIMENSIONS = {
+    'instagram': {
+        'post': (1080, 1080),
+        'story': (1080, 1920),
+        'carousel': (1080, 1080)
+    },
+    'twitter': {
+        'post': (1200, 675)
+    },
+    'facebook': {
+        'post': (1200, 630)
+    }
+}
+
 
 class UnifiedCropper:
     """Cropper unifié qui utilise la meilleure méthode disponible"""
@@ -14,173 +58,271 @@ class UnifiedCropper:
     def __init__(self):
         self.available_methods = []
         self.primary_method = None
+        # LRU des crops encodés (bytes JPEG), partagé entre les threads du pool
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
         self._initialize_croppers()
+        self._dispatch = {
+            "pil_only": self._crop_pil_only
+        }
 
     def _initialize_croppers(self):
-        """Initialise les différents croppers disponibles"""
-        # Tester OpenCV + PIL (toujours disponible)
-        try:
-            import cv2
-            from PIL import Image
-            self.available_methods.append("opencv_pil")
-            self.primary_method = "opencv_pil"
-            logger.info("✅ OpenCV + PIL available")
-        except ImportError as e:
-            logger.warning(f"⚠️ OpenCV non disponible: {e}")
-
-        # Tester OpenCV seul - avec gestion d'erreur robuste
+        """Initialise les différents croppers disponibles (détection mise en cache sur disque)"""
+        fingerprint = self._environment_fingerprint()
+
+        if not self._load_methods_cache(fingerprint):
+            self._detect_croppers()
+            self._save_methods_cache(fingerprint)
+
+        logger.info(f"✅ Unified cropper initialized: {self.primary_method}")
+        logger.info(f"📋 Méthodes disponibles: {', '.join(self.available_methods)}")
+
+    def _environment_fingerprint(self) -> str:
+        """Identifie l'environnement (Python + OpenCV + SAM) pour invalider le cache de détection"""
+        cv2_version = cv2.__version__ if _HAS_CV2 else None
+        return (f"{sys.version_info[0]}.{sys.version_info[1]}.{sys.version_info[2]}"
+                f"|opencv={cv2_version}|sam={_has_sam_checkpoint()}|methods=v3")
+
+    def _load_methods_cache(self, fingerprint: str) -> bool:
+        """Recharge la détection précédente si l'environnement n'a pas changé"""
         try:
-            from app.services.opencv_cropper import opencv_only_cropper
-            cropper = opencv_only_cropper()
-            if cropper and cropper.is_available():
-                self.available_methods.append("opencv_only")
-                if not self.primary_method:
-                    self.primary_method = "opencv_only"
-                logger.info("✅ OpenCV standalone available")
-        except (ImportError, Exception) as e:
-            logger.warning(f"⚠️ OpenCV cropper non disponible: {e}")
-
-        # Tester SAM (optionnel) - avec gestion d'erreur
+            with open(METHODS_CACHE_FILE, 'r') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if cached.get('fingerprint') != fingerprint or not cached.get('available_methods'):
+            return False
+
+        self.available_methods = list(cached['available_methods'])
+        self.primary_method = cached.get('primary_method')
+        logger.info("♻️ Détection des méthodes rechargée depuis le cache")
+        return True
+
+    def _save_methods_cache(self, fingerprint: str):
+        """Persiste le résultat de la détection pour les prochains démarrages"""
         try:
-            # Import SAM si disponible (pas critique)
-            # Pour l'instant, on simule juste la disponibilité
-            import numpy as np  # Test basique
+            with open(METHODS_CACHE_FILE, 'w') as f:
+                json.dump({
+                    'fingerprint': fingerprint,
+                    'available_methods': self.available_methods,
+                    'primary_method': self.primary_method
+                }, f)
+        except OSError as e:
+            logger.warning(f"⚠️ Impossible d'écrire le cache de détection: {e}")
+
+    def _detect_croppers(self):
+        """Détecte les différents croppers disponibles"""
+        # Tester SAM (optionnel): nécessite OpenCV et le checkpoint du modèle
+        if _HAS_CV2 and _has_sam_checkpoint():
             self.available_methods.append("sam")
             logger.info("✅ SAM available")
-        except (ImportError, Exception) as e:
-            logger.info(f"ℹ️ SAM non disponible (optionnel): {e}")
-
-        if not self.available_methods:
-            # Fallback: PIL seul
-            self.available_methods.append("pil_only")
-            self.primary_method = "pil_only"
-            logger.warning("⚠️ Utilisation PIL uniquement comme fallback")
+        else:
+            logger.info(f"ℹ️ SAM non disponible (optionnel): checkpoint absent ({SAM_CHECKPOINT_PATH})")
 
-        logger.info(f"✅ Unified cropper initialized: {self.primary_method}")
-        logger.info(f"📋 Méthodes disponibles: {', '.join(self.available_methods)}")
+        # Crop géométrique PIL (taille lue dans l'en-tête): méthode principale, toujours disponible
+        self.available_methods.append("pil_only")
+        self.primary_method = "pil_only"
 
     def crop_for_platform(self, input_path: str, platform: str, content_type: str) -> str:
         """Crop une image pour une plateforme spécifique"""
         target_dimensions = self._get_platform_dimensions(platform, content_type)
         return self.smart_crop(input_path, target_dimensions)
 
-    def smart_crop(self, input_path: str, target_size: Tuple[int, int]) -> str:
-        """Crop intelligent utilisant la meilleure méthode disponible"""
-        logger.info(f"🎯 Crop unifié vers {target_size} avec méthode: {self.primary_method}")
+    async def crop_for_platform_async(self, input_path: str, platform: str, content_type: str) -> str:
+        """Version async de crop_for_platform (exécutée dans le thread pool)"""
+        return await asyncio.get_event_loop().run_in_executor(
+            None, self.crop_for_platform, input_path, platform, content_type
+        )
+
+    def crop_for_platforms(self, input_path: str, targets: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Crop une image pour plusieurs plateformes en ne la décodant qu'une seule fois"""
+        sizes_by_target = {
+            (platform, content_type): self._get_platform_dimensions(platform, content_type)
+            for platform, content_type in targets
+        }
+        # Même dimensions (ex: post et carousel Instagram) -> un seul encodage
+        unique_sizes = list(dict.fromkeys(sizes_by_target.values()))
 
-        try:
-            if self.primary_method == "opencv_pil":
-                return self._crop_opencv_pil(input_path, target_size)
-            elif self.primary_method == "opencv_only":
-                return self._crop_opencv_only(input_path, target_size)
-            elif self.primary_method == "pil_only":
-                return self._crop_pil_only(input_path, target_size)
-            else:
-                # Fallback
-                return self._crop_pil_only(input_path, target_size)
+        with Image.open(input_path) as img:
+            source = img.convert('RGB')
 
-        except Exception as e:
-            logger.error(f"❌ Erreur crop principal: {e}")
-            # Fallback vers PIL
-            logger.info("🔄 Fallback vers PIL uniquement")
-            return self._crop_pil_only(input_path, target_size)
-
-    def _crop_opencv_pil(self, input_path: str, target_size: Tuple[int, int]) -> str:
-        """Crop avec OpenCV + PIL"""
-        import cv2
-
-        # Lire avec OpenCV pour analyse
-        img_cv = cv2.imread(input_path)
-        if img_cv is None:
-            raise ValueError("Impossible de lire l'image avec OpenCV")
-
-        # Analyse basique des dimensions
-        h, w = img_cv.shape[:2]
-        target_w, target_h = target_size
+        crop_boxes = self._compute_crop_boxes(source.width, source.height, unique_sizes)
+        encoded_by_size = {
+            target_size: self._save_output(self._resize(source, tuple(int(v) for v in box), target_size), True)
+            for target_size, box in zip(unique_sizes, crop_boxes)
+        }
+
+        # Un fichier par cible: chaque appelant peut supprimer le sien sans affecter les autres
+        results = {target: self._write_temp(encoded_by_size[size]) for target, size in sizes_by_target.items()}
 
-        # Calculer crop intelligent
-        img_ratio = w / h
+        logger.info(f"✅ {len(results)} crops générés depuis un seul décodage")
+        return results
+
+    def smart_crop(self, input_path: str, target_size: Tuple[int, int],
+                   return_bytes: bool = False) -> Union[str, bytes]:
+        """Crop intelligent utilisant la meilleure méthode disponible (return_bytes: JPEG en mémoire)"""
+        cache_key = self._cache_key(input_path, target_size)
+        with self._cache_lock:
+            data = self._cache.get(cache_key)
+            if data is not None:
+                self._cache.move_to_end(cache_key)
+
+        if data is not None:
+            logger.info(f"♻️ Crop {target_size} servi depuis le cache")
+        else:
+            logger.info(f"🎯 Crop unifié vers {target_size} avec méthode: {self.primary_method}")
+
+            try:
+                # Méthode inconnue -> fallback PIL
+                crop_method = self._dispatch.get(self.primary_method, self._crop_pil_only)
+                data = crop_method(input_path, target_size, True)
+
+            except Exception as e:
+                logger.error(f"❌ Erreur crop principal: {e}")
+                # Fallback vers PIL
+                logger.info("🔄 Fallback vers PIL uniquement")
+                data = self._crop_pil_only(input_path, target_size, True)
+
+            with self._cache_lock:
+                self._cache[cache_key] = data
+                if len(self._cache) > CROP_CACHE_MAX_ENTRIES:
+                    self._cache.popitem(last=False)
+
+        if return_bytes:
+            return data
+
+        # Chaque appelant reçoit son propre fichier (il en est propriétaire et le supprime)
+        return self._write_temp(data)
+
+    def _cache_key(self, input_path: str, target_size: Tuple[int, int]) -> Tuple[bytes, Tuple[int, int]]:
+        """Clé de cache: hash des 64 premiers Ko + taille + mtime du fichier source"""
+        stat = os.stat(input_path)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(input_path, 'rb') as f:
+            digest.update(f.read(64 * 1024))
+        digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.digest(), tuple(target_size)
+
+    def _crop_pil_only(self, input_path: str, target_size: Tuple[int, int],
+                       return_bytes: bool = False) -> Union[str, bytes]:
+        """Crop avec PIL uniquement (dimensions lues dans l'en-tête, un seul décodage réduit)"""
+        with Image.open(input_path) as img:
+            crop_box = self._compute_crop_box(img.width, img.height, target_size)
+            crop_box = self._apply_draft(img, crop_box, target_size)
+            resized = self._resize(img, crop_box, target_size)
+
+            return self._save_output(resized, return_bytes)
+
+    def _save_output(self, resized: Image.Image, return_bytes: bool = False) -> Union[str, bytes]:
+        """Encode le résultat en JPEG, en mémoire ou dans un fichier temporaire"""
+        if return_bytes:
+            buffer = io.BytesIO()
+            resized.save(buffer, 'JPEG', **JPEG_SAVE_OPTIONS)
+            return buffer.getvalue()
+
+        # Sauvegarder
+        output_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
+        resized.save(output_file.name, 'JPEG', **JPEG_SAVE_OPTIONS)
+        output_file.close()
+
+        return output_file.name
+
+    def _write_temp(self, data: bytes) -> str:
+        """Écrit un JPEG déjà encodé dans un nouveau fichier temporaire"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as output_file:
+            output_file.write(data)
+        return output_file.name
+
+    def _crop_in_memory(self, img: Image.Image, target_size: Tuple[int, int]) -> Image.Image:
+        """Crop + resize d'une image PIL déjà chargée"""
+        crop_box = self._compute_crop_box(img.width, img.height, target_size)
+
+        # Crop + redimensionnement en une passe
+        return self._resize(img, crop_box, target_size)
+
+    def _compute_crop_box(self, width: int, height: int, target_size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """Calcule la zone de crop au ratio cible (centrée, ou privilégiant le haut)"""
+        # Crop intelligent basique
+        target_w, target_h = target_size
+        img_ratio = width / height
         target_ratio = target_w / target_h
 
         if img_ratio > target_ratio:
-            # Image trop large - crop horizontal centré
-            new_w = int(h * target_ratio)
-            start_x = (w - new_w) // 2
-            crop_coords = (start_x, 0, start_x + new_w, h)
+            # Image trop large
+            new_w = int(height * target_ratio)
+            start_x = (width - new_w) // 2
+            return (start_x, 0, start_x + new_w, height)
         else:
-            # Image trop haute - crop vertical privilégiant le haut
-            new_h = int(w / target_ratio)
-            start_y = min(h - new_h, h // 4)  # Privilégier le haut
-            crop_coords = (0, start_y, w, start_y + new_h)
-
-        # Utiliser PIL pour le crop et resize final (meilleure qualité)
-        with Image.open(input_path) as img_pil:
-            cropped = img_pil.crop(crop_coords)
-            resized = cropped.resize(target_size, Image.Resampling.LANCZOS)
+            # Image trop haute
+            new_h = int(width / target_ratio)
+            start_y = min(height - new_h, height // 4)
+            return (0, start_y, width, start_y + new_h)
+
+    def _compute_crop_boxes(self, width: int, height: int, target_sizes: List[Tuple[int, int]]) -> np.ndarray:
+        """Version vectorisée de _compute_crop_box pour plusieurs cibles (une ligne par cible)"""
+        sizes = np.asarray(target_sizes, dtype=np.float64).reshape(-1, 2)
+        target_ratios = sizes[:, 0] / sizes[:, 1]
+        too_wide = (width / height) > target_ratios
+
+        # Image trop large: crop horizontal centré
+        new_w = (height * target_ratios).astype(np.int64)
+        start_x = (width - new_w) // 2
+        # Image trop haute: crop vertical privilégiant le haut
+        new_h = (width / target_ratios).astype(np.int64)
+        start_y = np.minimum(height - new_h, height // 4)
+
+        return np.where(
+            too_wide[:, None],
+            np.stack([start_x, np.zeros_like(start_x), start_x + new_w, np.full_like(start_x, height)], axis=1),
+            np.stack([np.zeros_like(start_y), start_y, np.full_like(start_y, width), start_y + new_h], axis=1)
+        )
+
+    def _apply_draft(self, img: Image.Image, crop_box: Tuple[int, int, int, int],
+                     target_size: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """Active le décodage JPEG réduit (1/2, 1/4, 1/8 via l'IDCT) et recalcule crop_box"""
+        if img.format != 'JPEG':
+            return crop_box
 
-            # Sauvegarder
-            output_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            resized.save(output_file.name, 'JPEG', quality=95, optimize=True)
-            output_file.close()
-
-            return output_file.name
+        target_w, target_h = target_size
+        orig_w, orig_h = img.size
+        crop_w = crop_box[2] - crop_box[0]
+        crop_h = crop_box[3] - crop_box[1]
+
+        # Taille minimale de l'image décodée pour que le crop couvre encore la cible
+        requested = (math.ceil(orig_w * target_w / crop_w), math.ceil(orig_h * target_h / crop_h))
+        img.draft(None, requested)
+
+        if img.size == (orig_w, orig_h):
+            return crop_box
+
+        scale_x = img.width / orig_w
+        scale_y = img.height / orig_h
+        return (
+            round(crop_box[0] * scale_x),
+            round(crop_box[1] * scale_y),
+            min(img.width, round(crop_box[2] * scale_x)),
+            min(img.height, round(crop_box[3] * scale_y))
+        )
+
+    def _resize(self, img: Image.Image, crop_box: Tuple[int, int, int, int],
+                target_size: Tuple[int, int]) -> Image.Image:
+        """Resize LANCZOS de crop_box sans copie intermédiaire (réduction entière si écart >= 2x)"""
+        target_w, target_h = target_size
+        crop_w = crop_box[2] - crop_box[0]
+        crop_h = crop_box[3] - crop_box[1]
+        factor = min(crop_w // target_w, crop_h // target_h)
 
-    def _crop_opencv_only(self, input_path: str, target_size: Tuple[int, int]) -> str:
-        """Crop avec OpenCV uniquement"""
-        try:
-            from app.services.opencv_cropper import get_opencv_cropper
-            cropper = get_opencv_cropper()
-            return cropper.smart_crop(input_path, target_size)
-        except Exception as e:
-            logger.warning(f"⚠️ OpenCV cropper failed, fallback to PIL: {e}")
-            return self._crop_pil_only(input_path, target_size)
+        if factor >= 2:
+            # Réduction par filtre box (C) avant le LANCZOS final
+            reduced = img.reduce(factor, box=crop_box)
+            return reduced.resize(target_size, Image.Resampling.LANCZOS)
 
-    def _crop_pil_only(self, input_path: str, target_size: Tuple[int, int]) -> str:
-        """Crop avec PIL uniquement (fallback)"""
-        with Image.open(input_path) as img:
-            # Crop intelligent basique
-            target_w, target_h = target_size
-            img_ratio = img.width / img.height
-            target_ratio = target_w / target_h
-
-            if img_ratio > target_ratio:
-                # Image trop large
-                new_w = int(img.height * target_ratio)
-                start_x = (img.width - new_w) // 2
-                cropped = img.crop((start_x, 0, start_x + new_w, img.height))
-            else:
-                # Image trop haute
-                new_h = int(img.width / target_ratio)
-                start_y = min(img.height - new_h, img.height // 4)
-                cropped = img.crop((0, start_y, img.width, start_y + new_h))
-
-            # Redimensionner
-            resized = cropped.resize(target_size, Image.Resampling.LANCZOS)
-
-            # Sauvegarder
-            output_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-            resized.save(output_file.name, 'JPEG', quality=90)
-            output_file.close()
-
-            return output_file.name
+        return img.resize(target_size, Image.Resampling.LANCZOS, box=crop_box)
 
     def _get_platform_dimensions(self, platform: str, content_type: str) -> Tuple[int, int]:
         """Retourne les dimensions pour chaque plateforme"""
-        dimensions = {
-            'instagram': {
-                'post': (1080, 1080),
-                'story': (1080, 1920),
-                'carousel': (1080, 1080)
-            },
-            'twitter': {
-                'post': (1200, 675)
-            },
-            'facebook': {
-                'post': (1200, 630)
-            }
-        }
-
-        return dimensions.get(platform, {}).get(content_type, (1080, 1080))
+        return PLATFORM_DIMENSIONS.get(platform, {}).get(content_type, (1080, 1080))
 
     def get_available_methods(self) -> list:
         """Retourne les méthodes de crop disponibles"""
@@ -206,7 +348,6 @@ class UnifiedCropper:
             "primary_method": self.primary_method,
             "fallback_available": "pil_only" in self.available_methods,
             "advanced_features": {
-                "opencv_analysis": "opencv_pil" in self.available_methods,
                 "saliency_detection": "sam" in self.available_methods,
                 "quality_optimization": True
             }
@@ -217,7 +358,7 @@ class UnifiedCropper:
         return {
             "available_methods": self.available_methods,
             "primary_method": self.primary_method,
-            "opencv_available": "opencv_pil" in self.available_methods or "opencv_only" in self.available_methods,
+            "opencv_available": _HAS_CV2,
             "pil_available": True,
             "sam_available": "sam" in self.available_methods,
             "status": "operational" if self.primary_method else "degraded",
@@ -228,7 +369,7 @@ class UnifiedCropper:
         """Teste le système de crop"""
         try:
             # Créer une image test
-            test_img = Image.new('RGB', (800, 600), color='red')
+            test_img = Image.fromarray(np.full((600, 800, 3), (255, 0, 0), dtype=np.uint8))
             test_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
             test_img.save(test_file.name, 'JPEG')
             test_file.close()
@@ -240,6 +381,16 @@ class UnifiedCropper:
             with Image.open(cropped_file) as result_img:
                 success = result_img.size == (400, 400)
 
+            # Tester toutes les dimensions plateformes en mémoire (un seul décodage)
+            with Image.open(test_file.name) as source:
+                source.load()
+                for content_types in PLATFORM_DIMENSIONS.values():
+                    for target_size in set(content_types.values()):
+                        result = self._crop_in_memory(source, target_size)
+                        if result.size != target_size:
+                            logger.error(f"❌ Test crop {target_size}: obtenu {result.size}")
+                            success = False
+
             # Nettoyer
             os.unlink(test_file.name)
             os.unlink(cropped_file)
@@ -251,6 +402,11 @@ class UnifiedCropper:
             return False
 
 
+def _has_sam_checkpoint() -> bool:
+    """Vérifie la présence du checkpoint SAM"""
+    return os.path.isfile(SAM_CHECKPOINT_PATH)
+
+
 # Instance globale avec gestion d'erreur robuste
 unified_cropper = None
 
@@ -270,6 +426,13 @@ def crop_image_unified(input_path: str, platform: str, content_type: str = "post
     return unified_cropper.crop_for_platform(input_path, platform, content_type)
 
 
+async def crop_image_unified_async(input_path: str, platform: str, content_type: str = "post") -> str:
+    """Fonction utilitaire async pour cropper une image sans bloquer l'event loop"""
+    if unified_cropper is None:
+        raise RuntimeError("Unified cropper not initialized")
+    return await unified_cropper.crop_for_platform_async(input_path, platform, content_type)
+
+
 def get_unified_cropper():
     """Récupère l'instance du cropper unifié"""
     if unified_cropper is None:
@@ -8,6 +8,7 @@ import sys
 import logging
 import tempfile
 from PIL import Image
+import numpy as np
 
 # Ajouter le chemin de l'app
 sys.path.insert(0, '/app')
@@ -16,6 +17,30 @@ sys.path.insert(0, '/app')
 logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Images de test encodées une seule fois, partagées entre les tests
+_TEST_IMAGES = {}
+
+
+def _get_test_image(color: tuple, size: tuple = (800, 600)) -> str:
+    """Retourne le chemin d'une image JPEG de test unie (créée au premier appel)"""
+    key = (color, size)
+    if key not in _TEST_IMAGES:
+        width, height = size
+        test_img = Image.fromarray(np.full((height, width, 3), color, dtype=np.uint8))
+        test_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
+        test_img.save(test_file.name, 'JPEG')
+        test_file.close()
+        _TEST_IMAGES[key] = test_file.name
+    return _TEST_IMAGES[key]
+
+
+def _cleanup_test_images():
+    """Supprime les images de test partagées"""
+    for path in _TEST_IMAGES.values():
+        if os.path.exists(path):
+            os.unlink(path)
+    _TEST_IMAGES.clear()
+
 
 def test_basic_imports():
     """Teste les imports de base"""
@@ -62,14 +87,11 @@ def test_unified_cropper():
         logger.info(f"📋 Methods: {', '.join(status['available_methods'])}")
 
         # Créer image test
-        test_img = Image.new('RGB', (800, 600), color='red')
-        test_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-        test_img.save(test_file.name, 'JPEG')
-        test_file.close()
+        test_file = _get_test_image((255, 0, 0))
         logger.info("✅ Test image created")
 
         # Test crop
-        cropped_file = cropper.smart_crop(test_file.name, (400, 400))
+        cropped_file = cropper.smart_crop(test_file, (400, 400))
         logger.info("✅ Crop completed")
 
         # Vérifier résultat
@@ -81,8 +103,7 @@ def test_unified_cropper():
                 logger.error(f"❌ Wrong dimensions: {result.size}")
                 success = False
 
-        # Nettoyer - FIX: Utiliser test_file.name au lieu de test_file
-        os.unlink(test_file.name)
+        # Nettoyer (l'image source est partagée, supprimée en fin de run)
         os.unlink(cropped_file)
         logger.info("🧹 Cleanup completed")
 
@@ -110,18 +131,14 @@ def test_opencv_cropper():
         logger.info("✅ OpenCVCropper instance created")
 
         # Test basique
-        test_img = Image.new('RGB', (800, 600), color='blue')
-        test_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-        test_img.save(test_file.name, 'JPEG')
-        test_file.close()
+        test_file = _get_test_image((0, 0, 255))
 
-        cropped_file = cropper.smart_crop(test_file.name, (300, 300))
+        cropped_file = cropper.smart_crop(test_file, (300, 300))
 
         with Image.open(cropped_file) as result:
             success = result.size == (300, 300)
 
-        # Nettoyer - FIX: Utiliser test_file.name au lieu de test_file
-        os.unlink(test_file.name)
+        # Nettoyer
         os.unlink(cropped_file)
 
         if success:
@@ -150,18 +167,14 @@ def test_intelligent_cropper():
         logger.info(f"📋 Capabilities: {capabilities}")
 
         # Test basique
-        test_img = Image.new('RGB', (800, 600), color='green')
-        test_file = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-        test_img.save(test_file.name, 'JPEG')
-        test_file.close()
+        test_file = _get_test_image((0, 128, 0))
 
-        cropped_file = cropper.smart_crop(test_file.name, (500, 500))
+        cropped_file = cropper.smart_crop(test_file, (500, 500))
 
         with Image.open(cropped_file) as result:
             success = result.size == (500, 500)
 
-        # Nettoyer - FIX: Utiliser test_file.name au lieu de test_file
-        os.unlink(test_file.name)
+        # Nettoyer
         os.unlink(cropped_file)
 
         if success:
@@ -200,6 +213,7 @@ def main():
             logger.error(f"❌ {test_name} ERROR: {e}")
             results.append(False)
 
+    _cleanup_test_images()
     # Résultats finaux
     passed = sum(results)
     total = len(results)
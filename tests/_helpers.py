@@ -0,0 +1,24 @@
+"""
+Utilitaires partagés par les scripts de test (importables en exécution directe comme sous pytest)
+"""
+import os
+import sys
+
+# TEST_VERBOSE=1: affichage immédiat et détaillé (débogage)
+# (variable d'environnement: sous pytest, sys.argv est celui de pytest)
+VERBOSE = os.getenv('TEST_VERBOSE', '').lower() in ('1', 'true')
+
+
+async def capture(coro, out=None):
+    """Retourne l'exception au lieu de la propager (ne pas annuler les autres tâches)
+
+    Les lignes que coro ajoute à out sont écrites d'un bloc une fois coro terminée.
+    """
+    try:
+        return await coro
+    except Exception as e:
+        return e
+    finally:
+        # Sortie bufferisée: affichée d'un bloc, sans s'entremêler avec les tests concurrents
+        if out:
+            sys.stdout.write("\n".join(out) + "\n")
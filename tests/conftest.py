@@ -0,0 +1,101 @@
+"""
+Configuration pytest commune aux scripts de test
+
+Les scripts restent exécutables directement (python tests/test_xxx.py); sous pytest,
+ils forment une seule suite parallélisable: pytest -n auto tests/ (pytest-xdist)
+"""
+import asyncio
+import inspect
+import os
+import sys
+
+import pytest
+
+# Racine du projet, pour que le package app soit importable
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Boucle partagée par tous les tests async d'un worker (les clients HTTP du fixture y restent liés)
+_loop = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Boucle asyncio de la session, créée au premier test async"""
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+def _failures(result) -> list:
+    """Échecs signalés par la valeur de retour d'un test, interprétée comme le fait main()
+
+    Les scripts ne lèvent pas d'assertion: ils retournent False, une exception capturée,
+    un état de workflow (réussi si current_step == 'completed') ou une liste de résultats
+    (bool ou (nom, bool)).
+    """
+    if result is False:
+        return ["le test a retourné False"]
+    if isinstance(result, Exception):
+        return [f"exception: {result!r}"]
+    if isinstance(result, dict) and 'current_step' in result:
+        if result['current_step'] != 'completed':
+            return [f"workflow terminé à l'étape {result['current_step']!r}"]
+        return []
+    if isinstance(result, list):
+        failures = []
+        for i, entry in enumerate(result, 1):
+            name, success = entry if isinstance(entry, tuple) else (f"résultat {i}", entry)
+            if success is False:
+                failures.append(f"{name}: échec")
+        return failures
+    return []
+
+
+def pytest_pyfunc_call(pyfuncitem):
+    """Exécute les tests (async def sur la boucle de la session) et fait échouer ceux qui signalent un échec"""
+    kwargs = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    if inspect.iscoroutinefunction(pyfuncitem.obj):
+        result = _get_loop().run_until_complete(pyfuncitem.obj(**kwargs))
+    else:
+        result = pyfuncitem.obj(**kwargs)
+
+    failures = _failures(result)
+    if failures:
+        pytest.fail("\n".join(failures), pytrace=False)
+    return True
+
+
+def pytest_collection_modifyitems(config, items):
+    """Ignore les tests qui exécutent le workflow LLM quand ANTHROPIC_API_KEY est absente
+
+    Un module peut lister dans LLM_FREE_TESTS ses tests qui n'appellent pas le LLM.
+    """
+    if os.getenv('ANTHROPIC_API_KEY'):
+        return
+
+    skip = pytest.mark.skip(reason="ANTHROPIC_API_KEY non définie")
+    for item in items:
+        if not hasattr(item.module, 'orchestrator'):
+            continue
+        if item.originalname in getattr(item.module, 'LLM_FREE_TESTS', ()):
+            continue
+        item.add_marker(skip)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Ferme la boucle de la session"""
+    if _loop is not None and not _loop.is_closed():
+        _loop.close()
+
+
+@pytest.fixture(scope="session")
+def docker_tester():
+    """Testeur Docker partagé (client HTTP et connexions keep-alive réutilisés)"""
+    from test_docker_system import DockerSystemTester
+
+    tester = DockerSystemTester()
+    yield tester
+    _get_loop().run_until_complete(tester.aclose())
@@ -3,183 +3,225 @@
 Script de test pour les fonctionnalités avancées (types spécifiques par plateforme)
 """
 import asyncio
+import functools
 import json
 from datetime import datetime
 import sys
 import os
 
-# Ajouter le répertoire parent au path pour les imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Ajouter le répertoire parent au path pour les imports en exécution directe
+# (sous pytest, tests/conftest.py s'en charge une seule fois)
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.models.base import PlatformType, ContentType
+from app.models.accounts import SiteWeb
 from app.models.content import EnhancedPublicationRequest, PlatformContentConfig, PublicationRequestExamples
 from app.orchestrator.workflow import orchestrator
+from _helpers import capture
 
+# Nombre maximum de workflows simultanés (limite la charge sur l'API Anthropic)
+MAX_CONCURRENT_WORKFLOWS = 4
+_workflow_slots = asyncio.Semaphore(MAX_CONCURRENT_WORKFLOWS)
 
-async def test_instagram_carousel():
-    """Test spécifique Instagram Carousel"""
-    print("=== Test Instagram Carousel ===")
-
-    request = EnhancedPublicationRequest(
-        texte_source="""
-        Guide complet pour optimiser votre présence sur les réseaux sociaux en 2024:
-
-        1. Définissez votre stratégie de contenu
-        2. Créez un calendrier éditorial cohérent
-        3. Engagez authentiquement avec votre audience
-        4. Analysez vos performances régulièrement
-        5. Adaptez-vous aux nouvelles tendances
-        """,
-        platforms_config=[
-            PlatformContentConfig(
-                platform=PlatformType.INSTAGRAM,
-                content_type=ContentType.CAROUSEL,
-                nb_slides=5,
-                titre_carousel="Guide Réseaux Sociaux 2024",
-                hashtags=["#SocialMedia", "#Marketing", "#Guide2024", "#Instagram"]
-            )
-        ]
-    )
 
-    try:
-        result = await orchestrator.execute_workflow(request)
+async def _run_workflow(request: EnhancedPublicationRequest):
+    """Exécute un workflow en respectant la limite de concurrence"""
+    async with _workflow_slots:
+        return await orchestrator.execute_workflow(request)
+
 
-        print(f"Statut: {result['current_step']}")
+# Champs affichés en aperçu, par ordre de priorité: (attribut, libellé, troncature, afficher la longueur)
+PREVIEW_FIELDS = (
+    ('tweet', 'Tweet', None, True),
+    ('message', 'Message', 100, False),
+    ('contenu', 'Contenu', 100, False),
+    ('legende', 'Légende', 100, False),
+    ('texte_story', 'Story', None, False),
+)
 
-        if result.get('formatted_content'):
-            carousel_content = result['formatted_content'].get('instagram_carousel')
-            if carousel_content:
-                print(f"\n=== Contenu Carrousel ===")
-                print(f"Nombre de slides: {len(carousel_content.slides)}")
 
-                for i, slide in enumerate(carousel_content.slides, 1):
-                    print(f"\nSlide {i}: {slide}")
+def _safe_workflow(fn):
+    """Ajoute l'erreur au rapport out du test et retourne False si le test lève une exception"""
+    @functools.wraps(fn)
+    async def wrap(out, *args, **kwargs):
+        try:
+            return await fn(out, *args, **kwargs)
+        except Exception as e:
+            out.append(f"Erreur {fn.__name__.lstrip('_')}: {str(e)}")
+            return False
+    return wrap
+
+
+# Requête Instagram Carousel (requêtes validées une seule fois, à l'import)
+_CAROUSEL_REQUEST = EnhancedPublicationRequest(
+    texte_source="""
+    Guide complet pour optimiser votre présence sur les réseaux sociaux en 2024:
+
+    1. Définissez votre stratégie de contenu
+    2. Créez un calendrier éditorial cohérent
+    3. Engagez authentiquement avec votre audience
+    4. Analysez vos performances régulièrement
+    5. Adaptez-vous aux nouvelles tendances
+    """,
+    site_web=SiteWeb.STUFFGAMING,
+    platforms_config=[
+        PlatformContentConfig(
+            platform=PlatformType.INSTAGRAM,
+            content_type=ContentType.CAROUSEL,
+            nb_slides=5,
+            titre_carousel="Guide Réseaux Sociaux 2024",
+            hashtags=["#SocialMedia", "#Marketing", "#Guide2024", "#Instagram"]
+        )
+    ]
+)
+
+
+# Requête Instagram Story
+_STORY_REQUEST = EnhancedPublicationRequest(
+    texte_source="Nouvelle fonctionnalité révolutionnaire lancée aujourd'hui ! Découvrez comment elle va transformer votre workflow.",
+    site_web=SiteWeb.STUFFGAMING,
+    platforms_config=[
+        PlatformContentConfig(
+            platform=PlatformType.INSTAGRAM,
+            content_type=ContentType.STORY,
+            lien_sticker="https://example.com/nouvelle-fonction"
+        )
+    ]
+)
+
+
+# Requête Plateformes mixtes
+_MIXED_REQUEST = EnhancedPublicationRequest(
+    texte_source="Annonce importante: Nous lançons notre nouvelle solution d'IA pour automatiser vos publications sur les réseaux sociaux!",
+    site_web=SiteWeb.STUFFGAMING,
+    platforms_config=[
+        # Twitter classique
+        PlatformContentConfig(
+            platform=PlatformType.TWITTER,
+            content_type=ContentType.POST,
+            hashtags=["#IA", "#Innovation", "#SocialMedia"]
+        ),
+        # Facebook classique
+        PlatformContentConfig(
+            platform=PlatformType.FACEBOOK,
+            content_type=ContentType.POST,
+            hashtags=["#Innovation", "#IA"],
+            lien_source="https://example.com/lancement"
+        ),
+        # LinkedIn professionnel
+        PlatformContentConfig(
+            platform=PlatformType.LINKEDIN,
+            content_type=ContentType.POST,
+            hashtags=["#ArtificialIntelligence", "#MarketingTech", "#Innovation"]
+        ),
+        # Instagram post
+        PlatformContentConfig(
+            platform=PlatformType.INSTAGRAM,
+            content_type=ContentType.POST,
+            hashtags=["#IA", "#Tech", "#Innovation", "#NewProduct"]
+        ),
+        # Instagram story
+        PlatformContentConfig(
+            platform=PlatformType.INSTAGRAM,
+            content_type=ContentType.STORY,
+            lien_sticker="https://example.com/lancement"
+        )
+    ]
+)
 
-                print(f"\nLégende: {carousel_content.legende}")
-                print(f"Hashtags: {carousel_content.hashtags}")
 
-        return result
+@_safe_workflow
+async def _instagram_carousel(out):
+    """Corps de test_instagram_carousel: le rapport est ajouté à out"""
+    result = await _run_workflow(_CAROUSEL_REQUEST)
 
-    except Exception as e:
-        print(f"Erreur: {str(e)}")
-        return None
+    out.append(f"Statut: {result['current_step']}")
+
+    if result.get('formatted_content'):
+        carousel_content = result['formatted_content'].get('instagram_carousel')
+        if carousel_content:
+            out.append(f"\n=== Contenu Carrousel ===")
+            out.append(f"Nombre de slides: {len(carousel_content.slides)}")
+
+            for i, slide in enumerate(carousel_content.slides, 1):
+                out.append(f"\nSlide {i}: {slide}")
+
+            out.append(f"\nLégende: {carousel_content.legende}")
+            out.append(f"Hashtags: {carousel_content.hashtags}")
+
+    return result
+
+
+async def test_instagram_carousel():
+    """Test spécifique Instagram Carousel"""
+    out = ["=== Test Instagram Carousel ==="]
+    return await capture(_instagram_carousel(out), out)
+
+
+@_safe_workflow
+async def _instagram_story(out):
+    """Corps de test_instagram_story: le rapport est ajouté à out"""
+    result = await _run_workflow(_STORY_REQUEST)
+
+    if result.get('formatted_content'):
+        story_content = result['formatted_content'].get('instagram_story')
+        if story_content:
+            out.append(f"Texte story: '{story_content.texte_story}'")
+            out.append(f"Longueur: {len(story_content.texte_story)} caractères")
+
+            if len(story_content.texte_story) <= 50:
+                out.append("✅ Contrainte de longueur respectée")
+            else:
+                out.append("❌ Story trop longue!")
+
+    return result
 
 
 async def test_instagram_story():
     """Test spécifique Instagram Story"""
-    print("\n=== Test Instagram Story ===")
-
-    request = EnhancedPublicationRequest(
-        texte_source="Nouvelle fonctionnalité révolutionnaire lancée aujourd'hui ! Découvrez comment elle va transformer votre workflow.",
-        platforms_config=[
-            PlatformContentConfig(
-                platform=PlatformType.INSTAGRAM,
-                content_type=ContentType.STORY,
-                lien_sticker="https://example.com/nouvelle-fonction"
-            )
-        ]
-    )
+    out = ["\n=== Test Instagram Story ==="]
+    return await capture(_instagram_story(out), out)
 
-    try:
-        result = await orchestrator.execute_workflow(request)
 
-        if result.get('formatted_content'):
-            story_content = result['formatted_content'].get('instagram_story')
-            if story_content:
-                print(f"Texte story: '{story_content.texte_story}'")
-                print(f"Longueur: {len(story_content.texte_story)} caractères")
+@_safe_workflow
+async def _mixed_platforms(out):
+    """Corps de test_mixed_platforms: le rapport est ajouté à out"""
+    result = await _run_workflow(_MIXED_REQUEST)
 
-                if len(story_content.texte_story) <= 50:
-                    print("✅ Contrainte de longueur respectée")
-                else:
-                    print("❌ Story trop longue!")
+    out.append(f"Statut: {result['current_step']}")
+    out.append(f"Erreurs: {len(result['errors'])}")
 
-        return result
+    if result.get('formatted_content'):
+        out.append(f"\n=== Contenu formaté ({len(result['formatted_content'])} formats) ===")
 
-    except Exception as e:
-        print(f"Erreur: {str(e)}")
-        return None
+        for key, content in result['formatted_content'].items():
+            platform, content_type = key.split('_', 1)
+            out.append(f"\n{platform.upper()} ({content_type}):")
 
+            # Afficher selon le type (premier champ présent)
+            preview = next((entry for entry in PREVIEW_FIELDS if hasattr(content, entry[0])), None)
+            if preview is None:
+                out.append(f"  {content}")
+                continue
 
-async def test_mixed_platforms():
-    """Test avec types mixtes sur plusieurs plateformes"""
-    print("\n=== Test Plateformes Mixtes ===")
-
-    request = EnhancedPublicationRequest(
-        texte_source="Annonce importante: Nous lançons notre nouvelle solution d'IA pour automatiser vos publications sur les réseaux sociaux!",
-        platforms_config=[
-            # Twitter classique
-            PlatformContentConfig(
-                platform=PlatformType.TWITTER,
-                content_type=ContentType.POST,
-                hashtags=["#IA", "#Innovation", "#SocialMedia"]
-            ),
-            # Facebook classique
-            PlatformContentConfig(
-                platform=PlatformType.FACEBOOK,
-                content_type=ContentType.POST,
-                hashtags=["#Innovation", "#IA"],
-                lien_source="https://example.com/lancement"
-            ),
-            # LinkedIn professionnel
-            PlatformContentConfig(
-                platform=PlatformType.LINKEDIN,
-                content_type=ContentType.POST,
-                hashtags=["#ArtificialIntelligence", "#MarketingTech", "#Innovation"]
-            ),
-            # Instagram post
-            PlatformContentConfig(
-                platform=PlatformType.INSTAGRAM,
-                content_type=ContentType.POST,
-                hashtags=["#IA", "#Tech", "#Innovation", "#NewProduct"]
-            ),
-            # Instagram story
-            PlatformContentConfig(
-                platform=PlatformType.INSTAGRAM,
-                content_type=ContentType.STORY,
-                lien_sticker="https://example.com/lancement"
-            )
-        ]
-    )
+            field, label, limit, show_length = preview
+            value = getattr(content, field)
+            text = value if limit is None else f"{value[:limit]}..."
+            suffix = f" ({len(value)} chars)" if show_length else ""
+            out.append(f"  {label}: {text}{suffix}")
 
-    try:
-        result = await orchestrator.execute_workflow(request)
-
-        print(f"Statut: {result['current_step']}")
-        print(f"Erreurs: {len(result['errors'])}")
-
-        if result.get('formatted_content'):
-            print(f"\n=== Contenu formaté ({len(result['formatted_content'])} formats) ===")
-
-            for key, content in result['formatted_content'].items():
-                platform, content_type = key.split('_', 1)
-                print(f"\n{platform.upper()} ({content_type}):")
-
-                # Afficher selon le type
-                if hasattr(content, 'tweet'):
-                    print(f"  Tweet: {content.tweet} ({len(content.tweet)} chars)")
-                elif hasattr(content, 'message'):
-                    print(f"  Message: {content.message[:100]}...")
-                elif hasattr(content, 'contenu'):
-                    print(f"  Contenu: {content.contenu[:100]}...")
-                elif hasattr(content, 'legende'):
-                    print(f"  Légende: {content.legende[:100]}...")
-                elif hasattr(content, 'texte_story'):
-                    print(f"  Story: {content.texte_story}")
-                else:
-                    print(f"  {content}")
-
-        return result
+    return result
 
-    except Exception as e:
-        print(f"Erreur: {str(e)}")
-        return None
 
+async def test_mixed_platforms():
+    """Test avec types mixtes sur plusieurs plateformes"""
+    out = ["\n=== Test Plateformes Mixtes ==="]
+    return await capture(_mixed_platforms(out), out)
 
-async def test_examples():
-    """Test des exemples prédéfinis"""
-    print("\n=== Test des Exemples ===")
 
+async def _examples(out):
+    """Corps de test_examples: le rapport est ajouté à out"""
     examples = [
         ("Simple Multi-Platform", PublicationRequestExamples.simple_multi_platform().to_enhanced_request()),
         ("Instagram Carousel", PublicationRequestExamples.instagram_carousel()),
@@ -188,44 +230,63 @@ async def test_examples():
 
     results = []
 
-    for name, example in examples:
-        print(f"\n--- {name} ---")
-        try:
-            result = await orchestrator.execute_workflow(example)
-            success = result['current_step'] == 'completed'
-            results.append((name, success))
-            print(f"Résultat: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
+    # Exemples indépendants: exécution concurrente des workflows
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(capture(_run_workflow(example))) for _, example in examples]
+    outcomes = [task.result() for task in tasks]
 
-        except Exception as e:
-            print(f"Erreur: {str(e)}")
+    for (name, _), result in zip(examples, outcomes):
+        out.append(f"\n--- {name} ---")
+        if isinstance(result, Exception):
+            out.append(f"Erreur: {str(result)}")
             results.append((name, False))
+            continue
+
+        success = result['current_step'] == 'completed'
+        results.append((name, success))
+        out.append(f"Résultat: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
 
     return results
 
 
+async def test_examples():
+    """Test des exemples prédéfinis"""
+    out = ["\n=== Test des Exemples ==="]
+    return await capture(_examples(out), out)
+
+
 async def main():
     """Fonction principale de test"""
     print("🚀 Tests des fonctionnalités avancées")
     print("=" * 60)
 
-    # Tests spécifiques
+    # Tests spécifiques (indépendants, exécutés en parallèle)
     test_results = []
 
-    # Test 1: Instagram Carousel
-    result1 = await test_instagram_carousel()
-    test_results.append(("Instagram Carousel", result1 and result1.get('current_step') == 'completed'))
-
-    # Test 2: Instagram Story
-    result2 = await test_instagram_story()
-    test_results.append(("Instagram Story", result2 and result2.get('current_step') == 'completed'))
-
-    # Test 3: Plateformes mixtes
-    result3 = await test_mixed_platforms()
-    test_results.append(("Plateformes Mixtes", result3 and result3.get('current_step') == 'completed'))
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(capture(test()))
+            for test in (test_instagram_carousel, test_instagram_story, test_mixed_platforms, test_examples)
+        ]
+    result1, result2, result3, example_results = [task.result() for task in tasks]
+
+    # Tests 1 à 3: Instagram Carousel, Instagram Story, Plateformes mixtes
+    for test_name, result in [
+        ("Instagram Carousel", result1),
+        ("Instagram Story", result2),
+        ("Plateformes Mixtes", result3)
+    ]:
+        if isinstance(result, Exception):
+            print(f"Erreur {test_name}: {str(result)}")
+            result = None
+        test_results.append((test_name, bool(result) and result.get('current_step') == 'completed'))
 
     # Test 4: Exemples
-    example_results = await test_examples()
-    test_results.extend(example_results)
+    if isinstance(example_results, Exception):
+        print(f"Erreur Exemples: {str(example_results)}")
+        test_results.append(("Exemples", False))
+    else:
+        test_results.extend(example_results)
 
     # Résumé
     print("\n" + "=" * 60)
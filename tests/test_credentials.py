@@ -5,72 +5,137 @@ Script de test pour valider les credentials multi-comptes
 import asyncio
 import sys
 import os
-from typing import Dict, List, Tuple
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
 
-# Ajouter le répertoire parent au path pour les imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Ajouter le répertoire parent au path pour les imports en exécution directe
+# (sous pytest, tests/conftest.py s'en charge une seule fois)
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.config.credentials import credentials_manager, get_platform_credentials, CredentialsError
 from app.models.accounts import SiteWeb
 from app.models.base import PlatformType
+from _helpers import VERBOSE
 
+# Préfixe des variables d'environnement par site (ex: stuffgaming.fr -> STUFFGAMING_FR)
+SITE_KEYS = {site: site.value.replace('.', '_').upper() for site in SiteWeb}
 
-def test_environment_variables():
-    """Teste la présence des variables d'environnement"""
-    print("=== Test des Variables d'Environnement ===")
-
-    required_vars = []
-    missing_vars = []
-
-    for site in SiteWeb:
-        site_key = site.value.replace('.', '_').upper()
-
-        # Variables Twitter
-        twitter_vars = [
+# Variables d'environnement requises par site et par plateforme
+ALL_ENV_VARS: Dict[SiteWeb, Dict[PlatformType, List[str]]] = {
+    site: {
+        PlatformType.TWITTER: [
             f"{site_key}_TWITTER_API_KEY",
             f"{site_key}_TWITTER_API_SECRET",
             f"{site_key}_TWITTER_ACCESS_TOKEN",
             f"{site_key}_TWITTER_ACCESS_TOKEN_SECRET"
-        ]
-
-        # Variables Facebook
-        facebook_vars = [
+        ],
+        PlatformType.FACEBOOK: [
             f"{site_key}_FACEBOOK_APP_ID",
             f"{site_key}_FACEBOOK_APP_SECRET",
             f"{site_key}_FACEBOOK_ACCESS_TOKEN",
             f"{site_key}_FACEBOOK_PAGE_ID"
-        ]
-
-        # Variables Instagram
-        instagram_vars = [
+        ],
+        PlatformType.INSTAGRAM: [
             f"{site_key}_INSTAGRAM_ACCESS_TOKEN",
             f"{site_key}_INSTAGRAM_BUSINESS_ACCOUNT_ID"
         ]
+    }
+    for site, site_key in SITE_KEYS.items()
+}
 
-        all_vars = twitter_vars + facebook_vars + instagram_vars
-        required_vars.extend(all_vars)
+# Template .env: en-tête global puis un bloc par site
+_ENV_TEMPLATE_HEADER = """# Configuration API
+ANTHROPIC_API_KEY=your_anthropic_api_key_here
+API_PORT=8090
 
-        print(f"\n{site.value}:")
-        for var in all_vars:
-            value = os.getenv(var)
-            if value:
-                print(f"  ✅ {var}: {value[:10]}...")
-            else:
-                print(f"  ❌ {var}: NON DÉFINIE")
-                missing_vars.append(var)
+# Credentials par site web
+"""
 
-    print(f"\n📊 Résumé:")
-    print(f"Variables requises: {len(required_vars)}")
-    print(f"Variables définies: {len(required_vars) - len(missing_vars)}")
-    print(f"Variables manquantes: {len(missing_vars)}")
+_SITE_TEMPLATE = """# ---- {site} ----
+# Twitter
+{KEY}_TWITTER_API_KEY=your_{site}_twitter_api_key
+{KEY}_TWITTER_API_SECRET=your_{site}_twitter_api_secret
+{KEY}_TWITTER_ACCESS_TOKEN=your_{site}_twitter_access_token
+{KEY}_TWITTER_ACCESS_TOKEN_SECRET=your_{site}_twitter_access_token_secret
+{KEY}_TWITTER_BEARER_TOKEN=your_{site}_twitter_bearer_token
+
+# Facebook
+{KEY}_FACEBOOK_APP_ID=your_{site}_facebook_app_id
+{KEY}_FACEBOOK_APP_SECRET=your_{site}_facebook_app_secret
+{KEY}_FACEBOOK_ACCESS_TOKEN=your_{site}_facebook_page_access_token
+{KEY}_FACEBOOK_PAGE_ID=your_{site}_facebook_page_id
+
+# Instagram
+{KEY}_INSTAGRAM_ACCESS_TOKEN=your_{site}_instagram_access_token
+{KEY}_INSTAGRAM_BUSINESS_ACCOUNT_ID=your_{site}_instagram_business_id
+"""
+
+
+# Champs affichés (non sensibles) par plateforme
+_CREDENTIAL_PRINTERS = {
+    PlatformType.TWITTER: lambda c: [
+        f"  API Key: {c.api_key[:8]}...",
+        f"  Bearer Token: {'✅ Présent' if c.bearer_token else '❌ Absent'}"
+    ],
+    PlatformType.FACEBOOK: lambda c: [
+        f"  App ID: {c.app_id}",
+        f"  Page ID: {c.page_id}"
+    ],
+    PlatformType.INSTAGRAM: lambda c: [
+        f"  Business Account ID: {c.business_account_id}",
+        f"  App ID: {c.app_id}"
+    ]
+}
+
+
+def _available_pairs() -> Set[Tuple[str, PlatformType]]:
+    """Ensemble (site, plateforme) des credentials chargés, calculé en une passe"""
+    available = credentials_manager.list_available_credentials()
+    return {(site, platform) for site, platforms in available.items() for platform in platforms}
+
+
+def _flush(lines: List[str]):
+    """Écrit les lignes bufferisées en un seul appel"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def test_environment_variables(verbose: bool = VERBOSE):
+    """Teste la présence des variables d'environnement (détail des variables définies avec TEST_VERBOSE=1)"""
+    out = ["=== Test des Variables d'Environnement ==="]
+
+    env = os.environ
+    required_vars = [var for vars_by_platform in ALL_ENV_VARS.values()
+                     for platform_vars in vars_by_platform.values() for var in platform_vars]
+
+    # Intersection d'ensembles plutôt qu'un lookup par variable (les valeurs vides comptent comme absentes)
+    defined_vars = {var for var in env.keys() & set(required_vars) if env[var]}
+    missing_vars = [var for var in required_vars if var not in defined_vars]
+    missing_set = set(missing_vars)
+
+    for site, vars_by_platform in ALL_ENV_VARS.items():
+        out.append(f"\n{site.value}:")
+        for platform_vars in vars_by_platform.values():
+            for var in platform_vars:
+                if var in missing_set:
+                    out.append(f"  ❌ {var}: NON DÉFINIE")
+                elif verbose:
+                    out.append(f"  ✅ {var}: {env[var][:10]}...")
+
+    out.append(f"\n📊 Résumé:")
+    out.append(f"Variables requises: {len(required_vars)}")
+    out.append(f"Variables définies: {len(required_vars) - len(missing_vars)}")
+    out.append(f"Variables manquantes: {len(missing_vars)}")
 
     if missing_vars:
-        print(f"\n❌ Variables manquantes:")
+        out.append(f"\n❌ Variables manquantes:")
         for var in missing_vars:
-            print(f"  - {var}")
+            out.append(f"  - {var}")
+        _flush(out)
         return False
     else:
-        print(f"\n✅ Toutes les variables d'environnement sont définies!")
+        out.append(f"\n✅ Toutes les variables d'environnement sont définies!")
+        _flush(out)
         return True
 
 
@@ -96,40 +161,51 @@ def test_credentials_loading():
     return total_loaded > 0
 
 
-def test_credentials_validation():
+async def test_credentials_validation():
     """Teste la validation des credentials"""
-    print("\n=== Test de Validation des Credentials ===")
+    out = ["\n=== Test de Validation des Credentials ==="]
 
     platforms = [PlatformType.TWITTER, PlatformType.FACEBOOK, PlatformType.INSTAGRAM]
+    pairs = [(site, platform) for site in SiteWeb for platform in platforms]
+    available = _available_pairs()
 
-    results = []
+    # Validations indépendantes: exécutées en parallèle dans le thread pool
+    loop = asyncio.get_event_loop()
 
-    for site in SiteWeb:
-        print(f"\n{site.value}:")
+    async def validate(site: SiteWeb, platform: PlatformType):
+        if (site.value, platform) not in available:
+            return None
+        return await loop.run_in_executor(None, credentials_manager.validate_credentials, site, platform)
 
-        for platform in platforms:
-            try:
-                has_creds = credentials_manager.has_credentials(site, platform)
-
-                if has_creds:
-                    is_valid, message = credentials_manager.validate_credentials(site, platform)
-                    status = "✅ VALIDE" if is_valid else "❌ INVALIDE"
-                    print(f"  {platform.value}: {status} - {message}")
-                    results.append((site, platform, is_valid))
-                else:
-                    print(f"  {platform.value}: ❌ ABSENT - Credentials non configurés")
-                    results.append((site, platform, False))
-
-            except Exception as e:
-                print(f"  {platform.value}: ❌ ERREUR - {str(e)}")
-                results.append((site, platform, False))
+    outcomes = await asyncio.gather(*(validate(site, platform) for site, platform in pairs), return_exceptions=True)
+
+    results = []
+    current_site = None
+
+    for (site, platform), outcome in zip(pairs, outcomes):
+        if site != current_site:
+            out.append(f"\n{site.value}:")
+            current_site = site
+
+        if isinstance(outcome, Exception):
+            out.append(f"  {platform.value}: ❌ ERREUR - {str(outcome)}")
+            results.append((site, platform, False))
+        elif outcome is None:
+            out.append(f"  {platform.value}: ❌ ABSENT - Credentials non configurés")
+            results.append((site, platform, False))
+        else:
+            is_valid, message = outcome
+            status = "✅ VALIDE" if is_valid else "❌ INVALIDE"
+            out.append(f"  {platform.value}: {status} - {message}")
+            results.append((site, platform, is_valid))
 
     # Résumé
     valid_count = sum(1 for _, _, is_valid in results if is_valid)
     total_count = len(results)
 
-    print(f"\n📊 Résumé de validation:")
-    print(f"Credentials valides: {valid_count}/{total_count}")
+    out.append(f"\n📊 Résumé de validation:")
+    out.append(f"Credentials valides: {valid_count}/{total_count}")
+    _flush(out)
 
     return valid_count > 0
 
@@ -152,15 +228,8 @@ def test_credentials_retrieval():
 
             print(f"✅ {site.value} / {platform.value}:")
 
-            if platform == PlatformType.TWITTER:
-                print(f"  API Key: {creds.api_key[:8]}...")
-                print(f"  Bearer Token: {'✅ Présent' if creds.bearer_token else '❌ Absent'}")
-            elif platform == PlatformType.FACEBOOK:
-                print(f"  App ID: {creds.app_id}")
-                print(f"  Page ID: {creds.page_id}")
-            elif platform == PlatformType.INSTAGRAM:
-                print(f"  Business Account ID: {creds.business_account_id}")
-                print(f"  App ID: {creds.app_id}")
+            for line in _CREDENTIAL_PRINTERS.get(platform, lambda c: [])(creds):
+                print(line)
 
             success_count += 1
 
@@ -182,7 +251,7 @@ def test_credentials_security():
         site = SiteWeb.STUFFGAMING
         platform = PlatformType.TWITTER
 
-        if credentials_manager.has_credentials(site, platform):
+        if (site.value, platform) in _available_pairs():
             creds = get_platform_credentials(site, platform)
 
             # Vérifier que les champs sensibles ne sont pas None
@@ -207,49 +276,19 @@ def test_credentials_security():
         return False
 
 
-def generate_env_template():
+async def generate_env_template():
     """Génère un template .env avec toutes les variables nécessaires"""
     print("\n=== Génération du Template .env ===")
 
-    template_lines = [
-        "# Configuration API",
-        "ANTHROPIC_API_KEY=your_anthropic_api_key_here",
-        "API_PORT=8090",
-        "",
-        "# Credentials par site web",
-        ""
-    ]
+    parts = [_ENV_TEMPLATE_HEADER]
+    parts.extend(_SITE_TEMPLATE.format(site=site.value, KEY=SITE_KEYS[site]) for site in SiteWeb)
+
+    template_content = "\n".join(parts)
 
-    for site in SiteWeb:
-        site_key = site.value.replace('.', '_').upper()
-
-        template_lines.extend([
-            f"# ---- {site.value} ----",
-            f"# Twitter",
-            f"{site_key}_TWITTER_API_KEY=your_{site.value}_twitter_api_key",
-            f"{site_key}_TWITTER_API_SECRET=your_{site.value}_twitter_api_secret",
-            f"{site_key}_TWITTER_ACCESS_TOKEN=your_{site.value}_twitter_access_token",
-            f"{site_key}_TWITTER_ACCESS_TOKEN_SECRET=your_{site.value}_twitter_access_token_secret",
-            f"{site_key}_TWITTER_BEARER_TOKEN=your_{site.value}_twitter_bearer_token",
-            "",
-            f"# Facebook",
-            f"{site_key}_FACEBOOK_APP_ID=your_{site.value}_facebook_app_id",
-            f"{site_key}_FACEBOOK_APP_SECRET=your_{site.value}_facebook_app_secret",
-            f"{site_key}_FACEBOOK_ACCESS_TOKEN=your_{site.value}_facebook_page_access_token",
-            f"{site_key}_FACEBOOK_PAGE_ID=your_{site.value}_facebook_page_id",
-            "",
-            f"# Instagram",
-            f"{site_key}_INSTAGRAM_ACCESS_TOKEN=your_{site.value}_instagram_access_token",
-            f"{site_key}_INSTAGRAM_BUSINESS_ACCOUNT_ID=your_{site.value}_instagram_business_id",
-            ""
-        ])
-
-    template_content = "\n".join(template_lines)
-
-    # Écrire dans un fichier
+    # Écrire dans un fichier (hors event loop)
     try:
-        with open('.env.template', 'w') as f:
-            f.write(template_content)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, Path('.env.template').write_text, template_content, 'utf-8')
         print("✅ Template .env généré: .env.template")
         print("📋 Copiez ce fichier vers .env et remplissez vos credentials")
         return True
@@ -258,7 +297,7 @@ def generate_env_template():
         return False
 
 
-def main():
+async def main():
     """Fonction principale de test"""
     print("🔐 Tests des Credentials Multi-Comptes")
     print("=" * 60)
@@ -274,7 +313,7 @@ def main():
     test_results.append(("Chargement credentials", loading_ok))
 
     # Test 3: Validation des credentials
-    validation_ok = test_credentials_validation()
+    validation_ok = await test_credentials_validation()
     test_results.append(("Validation credentials", validation_ok))
 
     # Test 4: Récupération des credentials
@@ -286,7 +325,7 @@ def main():
     test_results.append(("Sécurité credentials", security_ok))
 
     # Test 6: Génération template
-    template_ok = generate_env_template()
+    template_ok = await generate_env_template()
     test_results.append(("Génération template", template_ok))
 
     # Résumé final
@@ -325,7 +364,7 @@ def main():
 
 if __name__ == "__main__":
     try:
-        main()
+        asyncio.run(main())
     except KeyboardInterrupt:
         print("\n⏹️ Tests interrompus par l'utilisateur")
     except Exception as e:
@@ -3,58 +3,288 @@
 Script de test pour l'infrastructure Docker et le système distribué Celery
 """
 import asyncio
-import requests
+import httpx
 import json
 import time
 import sys
+import os
 from typing import Dict, Any
-from datetime import datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+from _helpers import VERBOSE
 
 # Configuration
 API_BASE_URL = "http://localhost:8090"
 FLOWER_URL = "http://localhost:5555"
 
+# Pool de connexions keep-alive partagé par les sondes HTTP exécutées en parallèle
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=16, max_connections=32)
+
+# États finaux d'une publication / d'un workflow
+TERMINAL_STATES = frozenset({'completed', 'failed'})
+
+# Réponses 5xx consécutives tolérées pendant l'attente d'un état final
+MAX_SERVER_ERRORS = 3
+
+# Prérequis de chaque test (résultats de log_test): le test est ignoré si l'un d'eux a échoué
+# Chaîne: santé API -> queues -> publications -> carrousel
+PREREQS = {
+    'test_api_endpoints': {'API Principal Health'},
+    'test_celery_queues': {'API Principal Health'},
+    'test_credentials_validation': {'API Principal Health'},
+    'test_simple_publication': {'API Principal Health'},
+    'test_async_publication': {'API Principal Health', 'Queue Status API'},
+    'test_instagram_carousel': {'API Principal Health', 'Queue Status API', 'Async Publication Submit'},
+}
+
+
+def _json(response):
+    """Décode le corps JSON d'une réponse (orjson si disponible, sinon json standard)"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return json.loads(response.content)
+
+
+class _AsyncStreamReader:
+    """Expose le flux d'une réponse httpx via le read() asynchrone attendu par ijson"""
+
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        # read(0) sert à ijson pour détecter le type du flux: ne rien consommer
+        if size == 0:
+            return b''
+        # b'' signifie fin de flux pour ijson: ignorer les éventuels blocs vides intermédiaires
+        async for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b''
+
+
+async def _count_top_level_keys(response: httpx.Response) -> int:
+    """Compte les clés de l'objet JSON racine d'une réponse en flux (0 si ce n'est pas un objet)"""
+    if ijson is not None:
+        # Parsing incrémental: ni le corps complet ni le dict ne sont gardés en mémoire
+        count = 0
+        async for _ in ijson.kvitems_async(_AsyncStreamReader(response), ''):
+            count += 1
+        return count
+
+    await response.aread()
+    data = _json(response)
+    return len(data) if isinstance(data, dict) else 0
+
+
+def _dumps(payload: Dict[str, Any]) -> bytes:
+    """Sérialise un payload JSON en bytes (orjson si disponible, sinon json standard)"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode()
+
+
+# Payloads /publish/async sérialisés une seule fois, réutilisables tels quels
+_JSON_HDR = {'Content-Type': 'application/json'}
+
+_ASYNC_PAYLOAD = _dumps({
+    "texte_source": "Test de publication asynchrone avec Celery et Docker!",
+    "site_web": "gaming.com",
+    "platforms_config": [
+        {
+            "platform": "twitter",
+            "content_type": "post",
+            "hashtags": ["#test", "#celery"]
+        },
+        {
+            "platform": "instagram",
+            "content_type": "post",
+            "hashtags": ["#test", "#async"]
+        }
+    ]
+})
+
+_CAROUSEL_PAYLOAD = _dumps({
+    "texte_source": "Guide complet en 3 étapes pour optimiser votre setup gaming",
+    "site_web": "stuffgaming.fr",
+    "platforms_config": [
+        {
+            "platform": "instagram",
+            "content_type": "carousel",
+            "nb_slides": 3,
+            "titre_carousel": "Setup Gaming Guide",
+            "hashtags": ["#gaming", "#setup", "#guide"]
+        }
+    ]
+})
+
 
 class DockerSystemTester:
     """Testeur pour l'infrastructure Docker et Celery"""
 
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, verbose: bool = VERBOSE):
+        self.verbose = verbose
+        self._lines = []
+        # Client asynchrone unique: connexions keep-alive réutilisées par toutes les sondes
+        self.client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=10.0)
+        self._agg = None
         self.test_results = []
+        self.failed = set()
 
     def log_test(self, test_name: str, success: bool, details: str = ""):
         """Log un résultat de test"""
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status} {test_name}")
+
+        self._log(f"{status} {test_name}")
         if details:
-            print(f"    {details}")
+            self._log(f"    {details}")
+
+        if not success:
+            self.failed.add(test_name)
 
         self.test_results.append({
             'test': test_name,
             'success': success,
             'details': details,
-            'timestamp': datetime.now().isoformat()
+            'ts_ns': time.time_ns()
+        })
+
+    async def _run_test(self, test):
+        """Exécute un test, ou l'ignore si l'un de ses prérequis a échoué"""
+        failed_prereqs = PREREQS.get(test.__name__, set()) & self.failed
+        if not failed_prereqs:
+            await test()
+            return
+
+        details = f"Prérequis en échec: {', '.join(sorted(failed_prereqs))}"
+        self._log(f"\n⏭️ SKIP {test.__name__}")
+        self._log(f"    {details}")
+        self.test_results.append({
+            'test': test.__name__,
+            'success': False,
+            'skipped': True,
+            'details': details,
+            'ts_ns': time.time_ns()
         })
 
-    def test_service_health(self):
+    def _log(self, line: str):
+        """Ajoute une ligne au journal en mémoire (affichée aussitôt en mode verbose)"""
+        self._lines.append(line)
+        if self.verbose:
+            print(line)
+
+    def flush_log(self):
+        """Écrit le journal en mémoire en une seule fois"""
+        if self._lines and not self.verbose:
+            sys.stdout.write("\n".join(self._lines) + "\n")
+            sys.stdout.flush()
+        self._lines.clear()
+
+    async def aclose(self):
+        """Ferme le client HTTP et ses connexions"""
+        await self.client.aclose()
+
+    async def _run_probes(self, probe, specs):
+        """Exécute des sondes indépendantes en parallèle"""
+        return await asyncio.gather(*(probe(spec) for spec in specs))
+
+    async def _wait_for(self, url: str, done_states=TERMINAL_STATES, deadline: float = 60,
+                        interval: float = 0.5, mult: float = 2.0, cap: float = 5.0,
+                        max_server_errors: int = MAX_SERVER_ERRORS):
+        """Interroge l'URL avec un backoff exponentiel jusqu'à un état final ou l'échéance
+
+        Une erreur 4xx est retournée aussitôt, une erreur 5xx après max_server_errors réponses consécutives.
+        """
+        end = time.monotonic() + deadline
+        server_errors = 0
+        while True:
+            response = await self.client.get(url)
+            if response.is_client_error:
+                return response
+            if response.is_server_error:
+                server_errors += 1
+                if server_errors >= max_server_errors:
+                    return response
+            else:
+                server_errors = 0
+
+            data = _json(response) if response.is_success else {}
+            if data.get('status') in done_states:
+                return response
+
+            # Échéance atteinte: retourner la dernière réponse (statut intermédiaire)
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return response
+
+            # Préférer l'estimation du serveur (Retry-After / estimated_ready_in) au backoff
+            delay = self._server_delay(response, data)
+            await asyncio.sleep(min(delay if delay is not None else interval, cap, remaining))
+            interval = min(interval * mult, cap)
+
+    async def _fetch_aggregate(self) -> Dict[str, Any]:
+        """Récupère une seule fois l'état agrégé (/status/all) et le met en cache"""
+        if self._agg is None:
+            try:
+                response = await self.client.get(f"{API_BASE_URL}/status/all")
+                self._agg = _json(response) if response.status_code == 200 else {}
+            except Exception:
+                # Endpoint absent ou API indisponible: chaque test interroge son endpoint dédié
+                self._agg = {}
+        return self._agg
+
+    def _aggregate_section(self, key: str):
+        """Section de l'état agrégé déjà récupéré (None si absente)"""
+        return (self._agg or {}).get(key)
+
+    @staticmethod
+    def _server_delay(response, data: Dict[str, Any]):
+        """Délai suggéré par le serveur avant la prochaine interrogation (None si absent)"""
+        hint = response.headers.get("Retry-After") or data.get("estimated_ready_in")
+        try:
+            return max(float(hint), 0.0) if hint is not None else None
+        except (TypeError, ValueError):
+            # Retry-After au format date HTTP: ignoré, on garde le backoff
+            return None
+
+    async def test_service_health(self):
         """Test la santé de tous les services"""
-        print("\n=== Test de Santé des Services ===")
+        self._log("\n=== Test de Santé des Services ===")
 
         services = [
-            ("API Principal", f"{API_BASE_URL}/health"),
-            ("Monitoring Celery", f"{API_BASE_URL}/health/celery"),  # Utiliser le nouvel endpoint
+            ("API Principal", f"{API_BASE_URL}/health", "health"),
+            ("Monitoring Celery", f"{API_BASE_URL}/health/celery", "celery"),  # Utiliser le nouvel endpoint
         ]
 
-        for service_name, url in services:
+        async def _probe(spec):
+            service_name, url, agg_key = spec
+
+            # Section déjà fournie par /status/all: pas d'appel dédié
+            data = self._aggregate_section(agg_key)
+            if data is not None:
+                details = "Source: /status/all"
+                if agg_key == "celery":
+                    details += f", Celery: {data.get('status', 'unknown')}, Workers: {data.get('worker_count', 0)}"
+                self.log_test(f"{service_name} Health", True, details)
+                return
+
             try:
-                response = self.session.get(url, timeout=10)
+                response = await self.client.get(url)
                 success = response.status_code == 200
                 details = f"Status: {response.status_code}"
 
                 # Pour Celery, ajouter des détails sur la santé
                 if "celery" in url and success:
                     try:
-                        data = response.json()
+                        data = _json(response)
                         celery_status = data.get('status', 'unknown')
                         worker_count = data.get('worker_count', 0)
                         details += f", Celery: {celery_status}, Workers: {worker_count}"
@@ -68,10 +298,12 @@ class DockerSystemTester:
             except Exception as e:
                 self.log_test(f"{service_name} Health", False, f"Error: {str(e)}")
 
+        await self._run_probes(_probe, services)
 
-    def test_api_endpoints(self):
+
+    async def test_api_endpoints(self):
         """Test les endpoints API principaux"""
-        print("\n=== Test des Endpoints API ===")
+        self._log("\n=== Test des Endpoints API ===")
 
         endpoints = [
             ("GET /", "get", "/"),
@@ -83,17 +315,18 @@ class DockerSystemTester:
             ("GET /metrics/workflows", "get", "/metrics/workflows"),
         ]
 
-        for test_name, method, endpoint in endpoints:
+        async def _probe(spec):
+            test_name, method, endpoint = spec
             try:
                 url = f"{API_BASE_URL}{endpoint}"
-                response = self.session.request(method, url, timeout=10)
+                response = await self.client.request(method, url)
 
                 success = response.status_code in [200, 404]  # 404 acceptable pour certains endpoints
                 details = f"Status: {response.status_code}"
 
                 if response.status_code == 200:
                     try:
-                        data = response.json()
+                        data = _json(response)
                         details += f", Response keys: {list(data.keys())[:3]}"
                     except:
                         details += ", Response: text"
@@ -103,15 +336,20 @@ class DockerSystemTester:
             except Exception as e:
                 self.log_test(test_name, False, f"Error: {str(e)}")
 
-    def test_celery_queues(self):
+        await self._run_probes(_probe, endpoints)
+
+    async def test_celery_queues(self):
         """Test l'état des queues Celery"""
-        print("\n=== Test des Queues Celery ===")
+        self._log("\n=== Test des Queues Celery ===")
 
         try:
-            response = self.session.get(f"{API_BASE_URL}/queue/status", timeout=10)
+            # Section déjà fournie par /status/all, sinon endpoint dédié
+            data = self._aggregate_section("queue")
+            if data is None:
+                response = await self.client.get(f"{API_BASE_URL}/queue/status")
+                data = _json(response) if response.status_code == 200 else None
 
-            if response.status_code == 200:
-                data = response.json()
+            if data is not None:
                 queues = data.get('queues', {})
 
                 expected_queues = ['content_generation', 'content_formatting', 'content_publishing', 'image_generation']
@@ -140,9 +378,9 @@ class DockerSystemTester:
         except Exception as e:
             self.log_test("Queue Status API", False, f"Error: {str(e)}")
 
-    def test_simple_publication(self):
+    async def test_simple_publication(self):
         """Test une publication simple"""
-        print("\n=== Test Publication Simple ===")
+        self._log("\n=== Test Publication Simple ===")
 
         try:
             payload = {
@@ -152,24 +390,23 @@ class DockerSystemTester:
                 "hashtags": ["#test", "#docker", "#automation"]
             }
 
-            response = self.session.post(
+            response = await self.client.post(
                 f"{API_BASE_URL}/publish",
                 json=payload,
                 timeout=30
             )
 
             if response.status_code == 200:
-                data = response.json()
+                data = _json(response)
                 request_id = data.get('request_id')
 
                 self.log_test("Simple Publication", True, f"Request ID: {request_id}")
 
-                # Attendre et vérifier le statut
-                time.sleep(5)
-                status_response = self.session.get(f"{API_BASE_URL}/status/{request_id}")
+                # Attendre la fin du traitement et vérifier le statut
+                status_response = await self._wait_for(f"{API_BASE_URL}/status/{request_id}")
 
                 if status_response.status_code == 200:
-                    status_data = status_response.json()
+                    status_data = _json(status_response)
                     final_status = status_data.get('status')
                     self.log_test("Publication Status Check", True, f"Status: {final_status}")
                 else:
@@ -182,46 +419,29 @@ class DockerSystemTester:
         except Exception as e:
             self.log_test("Simple Publication", False, f"Error: {str(e)}")
 
-    def test_async_publication(self):
+    async def test_async_publication(self):
         """Test une publication asynchrone avec Celery"""
-        print("\n=== Test Publication Asynchrone (Celery) ===")
+        self._log("\n=== Test Publication Asynchrone (Celery) ===")
 
         try:
-            payload = {
-                "texte_source": "Test de publication asynchrone avec Celery et Docker!",
-                "site_web": "gaming.com",
-                "platforms_config": [
-                    {
-                        "platform": "twitter",
-                        "content_type": "post",
-                        "hashtags": ["#test", "#celery"]
-                    },
-                    {
-                        "platform": "instagram",
-                        "content_type": "post",
-                        "hashtags": ["#test", "#async"]
-                    }
-                ]
-            }
-
-            response = self.session.post(
+            response = await self.client.post(
                 f"{API_BASE_URL}/publish/async",
-                json=payload,
+                content=_ASYNC_PAYLOAD,
+                headers=_JSON_HDR,
                 timeout=30
             )
 
             if response.status_code == 200:
-                data = response.json()
+                data = _json(response)
                 task_id = data.get('task_id')
 
                 self.log_test("Async Publication Submit", True, f"Task ID: {task_id}")
 
-                # Attendre et vérifier le workflow
-                time.sleep(10)
-                workflow_response = self.session.get(f"{API_BASE_URL}/workflow/{task_id}")
+                # Attendre la fin du workflow et vérifier son statut
+                workflow_response = await self._wait_for(f"{API_BASE_URL}/workflow/{task_id}")
 
                 if workflow_response.status_code == 200:
-                    workflow_data = workflow_response.json()
+                    workflow_data = _json(workflow_response)
                     workflow_status = workflow_data.get('status')
                     self.log_test("Async Workflow Status", True, f"Status: {workflow_status}")
                 else:
@@ -234,43 +454,29 @@ class DockerSystemTester:
         except Exception as e:
             self.log_test("Async Publication Submit", False, f"Error: {str(e)}")
 
-    def test_instagram_carousel(self):
+    async def test_instagram_carousel(self):
         """Test publication Instagram carrousel"""
-        print("\n=== Test Instagram Carrousel ===")
+        self._log("\n=== Test Instagram Carrousel ===")
 
         try:
-            payload = {
-                "texte_source": "Guide complet en 3 étapes pour optimiser votre setup gaming",
-                "site_web": "stuffgaming.fr",
-                "platforms_config": [
-                    {
-                        "platform": "instagram",
-                        "content_type": "carousel",
-                        "nb_slides": 3,
-                        "titre_carousel": "Setup Gaming Guide",
-                        "hashtags": ["#gaming", "#setup", "#guide"]
-                    }
-                ]
-            }
-
-            response = self.session.post(
+            response = await self.client.post(
                 f"{API_BASE_URL}/publish/async",
-                json=payload,
+                content=_CAROUSEL_PAYLOAD,
+                headers=_JSON_HDR,
                 timeout=30
             )
 
             if response.status_code == 200:
-                data = response.json()
+                data = _json(response)
                 task_id = data.get('task_id')
 
                 self.log_test("Instagram Carousel Submit", True, f"Task ID: {task_id}")
 
-                # Attendre plus longtemps pour la génération d'images
-                time.sleep(15)
-                workflow_response = self.session.get(f"{API_BASE_URL}/workflow/{task_id}")
+                # Échéance plus longue pour la génération d'images
+                workflow_response = await self._wait_for(f"{API_BASE_URL}/workflow/{task_id}", deadline=120)
 
                 if workflow_response.status_code == 200:
-                    workflow_data = workflow_response.json()
+                    workflow_data = _json(workflow_response)
                     workflow_status = workflow_data.get('status')
                     results = workflow_data.get('results', {})
 
@@ -290,9 +496,9 @@ class DockerSystemTester:
         except Exception as e:
             self.log_test("Instagram Carousel Submit", False, f"Error: {str(e)}")
 
-    def test_credentials_validation(self):
+    async def test_credentials_validation(self):
         """Test validation des credentials avec le bon format"""
-        print("\n=== Test Validation Credentials ===")
+        self._log("\n=== Test Validation Credentials ===")
 
         sites_platforms = [
             ("stuffgaming.fr", "twitter"),
@@ -303,14 +509,13 @@ class DockerSystemTester:
         for site, platform in sites_platforms:
             try:
                 # Utiliser form data au lieu de JSON
-                response = self.session.post(
+                response = await self.client.post(
                     f"{API_BASE_URL}/test/credentials",
-                    data={"site_web": site, "platform": platform},
-                    timeout=10
+                    data={"site_web": site, "platform": platform}
                 )
 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = _json(response)
                     credentials_valid = data.get('credentials_valid', False)
                     connection_test = data.get('connection_test', 'unknown')
 
@@ -326,16 +531,20 @@ class DockerSystemTester:
                 self.log_test(f"Credentials {site}/{platform}", False, f"Error: {str(e)}")
 
 
-    def test_flower_monitoring(self):
+    async def test_flower_monitoring(self):
         """Test l'interface de monitoring Flower avec auth"""
-        print("\n=== Test Monitoring Flower ===")
+        self._log("\n=== Test Monitoring Flower ===")
 
-        try:
-            # Test page principale avec auth - attendre un peu pour que Flower soit prêt
-            import time
-            time.sleep(2)  # Attendre que Flower soit complètement démarré
+        # Attendre un peu que Flower soit complètement démarré
+        await asyncio.sleep(2)
+
+        # Page principale et API workers: sondes indépendantes
+        await asyncio.gather(self._probe_flower_web(), self._probe_flower_workers())
 
-            response = self.session.get(
+    async def _probe_flower_web(self):
+        """Sonde la page principale Flower (avec auth)"""
+        try:
+            response = await self.client.get(
                 f"{FLOWER_URL}/",
                 auth=('admin', 'admin'),
                 timeout=15,
@@ -350,69 +559,97 @@ class DockerSystemTester:
 
             self.log_test("Flower Web Interface", success, details)
 
-            # Test API workers avec auth
-            response = self.session.get(
+        except Exception as e:
+            self.log_test("Flower Web Interface", False, f"Error: {str(e)}")
+
+    async def _probe_flower_workers(self):
+        """Sonde l'API workers Flower (avec auth)"""
+        # Workers déjà fournis par /status/all: pas d'appel à Flower
+        workers = self._aggregate_section("workers")
+        if workers is not None:
+            worker_count = len(workers) if isinstance(workers, dict) else 0
+            self.log_test("Flower Workers API", True, f"Workers: {worker_count} (Source: /status/all)")
+            return
+
+        try:
+            # Réponse lue en flux: seul le nombre de workers est utile
+            async with self.client.stream(
+                "GET",
                 f"{FLOWER_URL}/api/workers",
                 auth=('admin', 'admin'),
                 timeout=15,
                 headers={'Accept': 'application/json'}
-            )
-            if response.status_code == 200:
-                try:
-                    workers = response.json()
-                    worker_count = len(workers) if isinstance(workers, dict) else 0
-                    self.log_test("Flower Workers API", True, f"Workers: {worker_count}")
-                except:
-                    self.log_test("Flower Workers API", True, f"Response received (parsing issue)")
-            else:
-                details = f"Status: {response.status_code}"
-                if response.status_code == 401:
-                    details += " (Auth failed)"
+            ) as response:
+                if response.status_code == 200:
+                    try:
+                        worker_count = await _count_top_level_keys(response)
+                        self.log_test("Flower Workers API", True, f"Workers: {worker_count}")
+                    except:
+                        self.log_test("Flower Workers API", True, f"Response received (parsing issue)")
                 else:
-                    details += f", Response: {response.text[:100]}"
-                self.log_test("Flower Workers API", False, details)
+                    await response.aread()
+                    details = f"Status: {response.status_code}"
+                    if response.status_code == 401:
+                        details += " (Auth failed)"
+                    else:
+                        details += f", Response: {response.text[:100]}"
+                    self.log_test("Flower Workers API", False, details)
 
         except Exception as e:
-            self.log_test("Flower Monitoring", False, f"Error: {str(e)}")
+            self.log_test("Flower Workers API", False, f"Error: {str(e)}")
 
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """Exécute tous les tests"""
         print("🐳 Démarrage des tests de l'infrastructure Docker")
         print("=" * 60)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
 
-        # Tests d'infrastructure
-        self.test_service_health()
-        self.test_api_endpoints()
-        self.test_celery_queues()
-        self.test_flower_monitoring()
+        # État agrégé récupéré une seule fois pour les tests d'infrastructure
+        await self._fetch_aggregate()
 
-        # Tests fonctionnels
-        self.test_credentials_validation()
-        self.test_simple_publication()
-        self.test_async_publication()
-        self.test_instagram_carousel()
+        # Tests d'infrastructure puis tests fonctionnels (ignorés si un prérequis a échoué)
+        for test in (
+            self.test_service_health,
+            self.test_api_endpoints,
+            self.test_celery_queues,
+            self.test_flower_monitoring,
+            self.test_credentials_validation,
+            self.test_simple_publication,
+            self.test_async_publication,
+            self.test_instagram_carousel,
+        ):
+            await self._run_test(test)
 
         # Résumé
-        end_time = time.time()
+        end_time = time.perf_counter()
         duration = end_time - start_time
 
+        self.flush_log()
+
         print("\n" + "=" * 60)
         print("📊 RÉSUMÉ DES TESTS DOCKER")
         print("=" * 60)
 
-        passed = sum(1 for result in self.test_results if result['success'])
-        total = len(self.test_results)
+        # Tests ignorés (prérequis en échec): ni réussis ni comptés dans le total
+        ran = [result for result in self.test_results if not result.get('skipped')]
+        passed = sum(1 for result in ran if result['success'])
+        total = len(ran)
+        skipped = len(self.test_results) - total
 
         for result in self.test_results:
-            status = "✅" if result['success'] else "❌"
+            if result.get('skipped'):
+                status = "⏭️"
+            else:
+                status = "✅" if result['success'] else "❌"
             print(f"{status} {result['test']}")
 
         print(f"\nRésultat global: {passed}/{total} tests réussis")
+        if skipped:
+            print(f"⏭️ {skipped} test(s) ignoré(s) (prérequis en échec)")
         print(f"Durée: {duration:.2f} secondes")
 
-        if passed == total:
+        if passed == total and not skipped:
             print("🎉 Tous les tests Docker sont passés!")
             print("🚀 Infrastructure prête pour la production!")
             return True
@@ -422,6 +659,19 @@ class DockerSystemTester:
             return False
 
 
+async def test_docker_infrastructure(docker_tester):
+    """Point d'entrée pytest: suite Docker complète (fixture de tests/conftest.py)"""
+    assert await docker_tester.run_all_tests()
+
+
+async def _run_suite(tester: DockerSystemTester) -> bool:
+    """Exécute la suite puis ferme le client HTTP"""
+    try:
+        return await tester.run_all_tests()
+    finally:
+        await tester.aclose()
+
+
 def main():
     """Fonction principale"""
     print("🐳 Tests de l'Infrastructure Docker - Social Media Publisher")
@@ -430,13 +680,16 @@ def main():
     print("\n💡 Assurez-vous que les services Docker sont démarrés:")
     print("   ./rebuild_social_media_system.sh")
     print("   docker compose ps")
+    print("   (AUTO_YES=1 pour lancer les tests sans confirmation, ex. en CI)")
 
-    input("\n⏳ Appuyez sur Entrée pour continuer avec les tests...")
+    # Pas de confirmation sans terminal interactif ou avec AUTO_YES=1
+    if sys.stdin.isatty() and os.getenv('AUTO_YES', '').lower() not in ('1', 'true'):
+        input("\n⏳ Appuyez sur Entrée pour continuer avec les tests...")
 
     tester = DockerSystemTester()
 
     try:
-        success = tester.run_all_tests()
+        success = asyncio.run(_run_suite(tester))
 
         if success:
             print("\n🎯 Commandes utiles pour la suite:")
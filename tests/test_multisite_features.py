@@ -3,43 +3,64 @@
 Script de test pour les fonctionnalités multi-sites et multi-comptes
 """
 import asyncio
+import itertools
 import json
 from datetime import datetime
 import sys
 import os
 
-# Ajouter le répertoire parent au path pour les imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Ajouter le répertoire parent au path pour les imports en exécution directe
+# (sous pytest, tests/conftest.py s'en charge une seule fois)
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.models.base import PlatformType, ContentType
-from app.models.accounts import SiteWeb, account_mapping, validate_account_exists, AccountValidationError
+from app.models.accounts import SiteWeb, account_mapping
 from app.models.content import EnhancedPublicationRequest, PlatformContentConfig, PublicationRequestExamples
 from app.orchestrator.workflow import orchestrator
 
+# Durée maximale d'un workflow (secondes): un workflow bloqué fait échouer le test
+WORKFLOW_TIMEOUT = float(os.getenv('WORKFLOW_TIMEOUT', '120'))
+
+# Tests sans appel au LLM (exécutés sous pytest même sans ANTHROPIC_API_KEY)
+LLM_FREE_TESTS = ('test_account_validation', 'test_account_mapping')
+
+# Valeurs des énumérations (calculées une seule fois)
+SITE_VALUES = tuple(s.value for s in SiteWeb)
+PLATFORM_VALUES = tuple(p.value for p in PlatformType)
+
+
+async def _run_workflow(request: EnhancedPublicationRequest):
+    """Exécute un workflow avec une échéance absolue"""
+    return await asyncio.wait_for(orchestrator.execute_workflow(request), timeout=WORKFLOW_TIMEOUT)
+
+
+def _timeout_message() -> str:
+    """Message d'échec pour un workflow sans état final"""
+    return f"⏱️ Timeout: workflow non terminé après {WORKFLOW_TIMEOUT:.0f}s"
+
 
 async def test_account_validation():
     """Test de validation des comptes"""
     print("=== Test de validation des comptes ===")
 
-    test_cases = [
-        (SiteWeb.STUFFGAMING, PlatformType.INSTAGRAM),
-        (SiteWeb.GAMING, PlatformType.TWITTER),
-        (SiteWeb.FOOTBALL, PlatformType.FACEBOOK),
-    ]
-
-    for site, platform in test_cases:
-        try:
-            account = validate_account_exists(site, platform)
+    # Toutes les combinaisons site/plateforme: simple recherche dans le mapping, sans exceptions
+    for site, platform in itertools.product(SiteWeb, PlatformType):
+        account = account_mapping.get_account(site, platform)
+        if account is None:
+            print(f"➖ {site} / {platform}: aucun compte configuré")
+        elif account.is_active:
             print(f"✅ {site} / {platform}: {account.account_name}")
-        except AccountValidationError as e:
-            print(f"❌ {site} / {platform}: {str(e)}")
+        else:
+            print(f"❌ {site} / {platform}: compte désactivé")
 
     # Test compte inexistant
-    try:
-        validate_account_exists(SiteWeb.STUFFGAMING, PlatformType.LINKEDIN)
-        print("❌ Erreur: Compte LinkedIn pour StuffGaming ne devrait pas exister")
-    except AccountValidationError:
+    if account_mapping.get_account(SiteWeb.STUFFGAMING, PlatformType.LINKEDIN) is None:
         print("✅ Validation correcte: LinkedIn non disponible pour StuffGaming")
+        return True
+    else:
+        print("❌ Erreur: Compte LinkedIn pour StuffGaming ne devrait pas exister")
+        return False
 
 
 async def test_carousel_with_images():
@@ -75,7 +96,7 @@ async def test_carousel_with_images():
     )
 
     try:
-        result = await orchestrator.execute_workflow(request)
+        result = await _run_workflow(request)
 
         if result.get('formatted_content'):
             carousel_content = result['formatted_content'].get('instagram_carousel')
@@ -91,6 +112,10 @@ async def test_carousel_with_images():
 
         return result['current_step'] == 'completed'
 
+    except asyncio.TimeoutError:
+        print(_timeout_message())
+        return False
+
     except Exception as e:
         print(f"❌ Erreur: {str(e)}")
         return False
@@ -121,7 +146,7 @@ async def test_carousel_without_images():
     )
 
     try:
-        result = await orchestrator.execute_workflow(request)
+        result = await _run_workflow(request)
 
         if result.get('formatted_content'):
             carousel_content = result['formatted_content'].get('instagram_carousel')
@@ -135,6 +160,10 @@ async def test_carousel_without_images():
 
         return result['current_step'] == 'completed'
 
+    except asyncio.TimeoutError:
+        print(_timeout_message())
+        return False
+
     except Exception as e:
         print(f"❌ Erreur: {str(e)}")
         return False
@@ -177,25 +206,33 @@ async def test_multisite_publication():
 
     results = []
 
-    for i, request in enumerate(requests, 1):
+    # Sites indépendants: workflows exécutés en parallèle
+    outcomes = await asyncio.gather(*(_run_workflow(r) for r in requests), return_exceptions=True)
+
+    for i, (request, result) in enumerate(zip(requests, outcomes), 1):
         print(f"\n--- Test Site {i}: {request.site_web} ---")
-        try:
-            result = await orchestrator.execute_workflow(request)
-            success = result['current_step'] == 'completed'
-            results.append(success)
-
-            print(f"Statut: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
-            print(f"Erreurs: {len(result.get('errors', []))}")
-
-            if result.get('formatted_content'):
-                print(f"Contenus formatés: {len(result['formatted_content'])}")
-                for key in result['formatted_content'].keys():
-                    platform, content_type = key.split('_', 1)
-                    print(f"  - {platform} ({content_type})")
-
-        except Exception as e:
-            print(f"❌ Erreur: {str(e)}")
+
+        if isinstance(result, asyncio.TimeoutError):
+            print(_timeout_message())
+            results.append(False)
+            continue
+
+        if isinstance(result, Exception):
+            print(f"❌ Erreur: {str(result)}")
             results.append(False)
+            continue
+
+        success = result['current_step'] == 'completed'
+        results.append(success)
+
+        print(f"Statut: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
+        print(f"Erreurs: {len(result.get('errors', []))}")
+
+        if result.get('formatted_content'):
+            print(f"Contenus formatés: {len(result['formatted_content'])}")
+            for key in result['formatted_content'].keys():
+                platform, content_type = key.split('_', 1)
+                print(f"  - {platform} ({content_type})")
 
     return results
 
@@ -207,10 +244,14 @@ async def test_account_mapping():
     print(f"Total comptes configurés: {len(account_mapping.accounts)}")
     print(f"Comptes actifs: {len(account_mapping.list_active_accounts())}")
 
+    # Regroupement des comptes par site en un seul parcours du mapping
+    by_site = {site: [] for site in SiteWeb}
+    for account in account_mapping.accounts.values():
+        by_site[account.site_web].append(account)
+
     for site in SiteWeb:
-        site_accounts = account_mapping.list_accounts_for_site(site)
         print(f"\n{site}:")
-        for account in site_accounts:
+        for account in by_site[site]:
             status = "✅" if account.is_active else "❌"
             print(f"  {status} {account.platform}: {account.account_name}")
 
@@ -237,20 +278,27 @@ async def test_examples():
 
     results = []
 
-    for name, example in examples:
+    # Exemples indépendants: workflows exécutés en parallèle
+    outcomes = await asyncio.gather(*(_run_workflow(example) for _, example in examples), return_exceptions=True)
+
+    for (name, example), result in zip(examples, outcomes):
         print(f"\n--- {name} ---")
         print(f"Site: {example.site_web}")
         print(f"Plateformes: {[(c.platform, c.content_type) for c in example.platforms_config]}")
 
-        try:
-            result = await orchestrator.execute_workflow(example)
-            success = result['current_step'] == 'completed'
-            results.append((name, success))
-            print(f"Résultat: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
+        if isinstance(result, asyncio.TimeoutError):
+            print(_timeout_message())
+            results.append((name, False))
+            continue
 
-        except Exception as e:
-            print(f"❌ Erreur: {str(e)}")
+        if isinstance(result, Exception):
+            print(f"❌ Erreur: {str(result)}")
             results.append((name, False))
+            continue
+
+        success = result['current_step'] == 'completed'
+        results.append((name, success))
+        print(f"Résultat: {'✅ RÉUSSI' if success else '❌ ÉCHEC'}")
 
     return results
 
@@ -310,8 +358,8 @@ async def main():
 
     # Informations système
     print(f"\n📋 Configuration système:")
-    print(f"Sites supportés: {len(SiteWeb)} ({', '.join([s.value for s in SiteWeb])})")
-    print(f"Plateformes: {len(PlatformType)} ({', '.join([p.value for p in PlatformType])})")
+    print(f"Sites supportés: {len(SITE_VALUES)} ({', '.join(SITE_VALUES)})")
+    print(f"Plateformes: {len(PLATFORM_VALUES)} ({', '.join(PLATFORM_VALUES)})")
     print(f"Total comptes: {len(account_mapping.accounts)}")
 
 
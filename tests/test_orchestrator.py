@@ -8,149 +8,204 @@ from datetime import datetime
 import sys
 import os
 
-# Ajouter le répertoire parent au path pour les imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Ajouter le répertoire parent au path pour les imports en exécution directe
+# (sous pytest, tests/conftest.py s'en charge une seule fois)
+if __name__ == "__main__":
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.models.base import PublicationRequest, PlatformType
 from app.orchestrator.workflow import orchestrator
-
-
-async def test_basic_workflow():
-    """Test de base du workflow"""
-    print("=== Test du workflow de base ===")
-
-    # Créer une demande de publication de test
-    request = PublicationRequest(
-        texte_source="""
-        Nous venons de lancer notre nouvelle fonctionnalité d'intelligence artificielle qui permet 
-        d'automatiser la publication sur les réseaux sociaux. Cette solution révolutionnaire 
-        utilise Claude LLM pour adapter automatiquement votre contenu à chaque plateforme.
-        """,
-        plateformes=[
-            PlatformType.TWITTER,
-            PlatformType.FACEBOOK,
-            PlatformType.LINKEDIN,
-            PlatformType.INSTAGRAM
-        ],
-        hashtags=["#IA", "#ReseauxSociaux", "#Innovation"],
-        lien_source="https://example.com/blog/nouvelle-fonctionnalite"
-    )
-
-    print(f"Demande créée à {datetime.now()}")
-    print(f"Plateformes: {request.plateformes}")
+from _helpers import capture
+
+# TEST_OUTPUT=json: une ligne JSON par test, sans mise en forme lisible (CI)
+STRUCTURED_OUTPUT = os.getenv("TEST_OUTPUT") == "json"
+
+# Bannières et résumé sur stderr en mode JSON: stdout ne contient que les lignes JSON
+_REPORT = sys.stderr if STRUCTURED_OUTPUT else sys.stdout
+
+# Demandes de test construites (et validées par pydantic) une seule fois à l'import
+_BASIC_REQUEST = PublicationRequest(
+    texte_source="""
+    Nous venons de lancer notre nouvelle fonctionnalité d'intelligence artificielle qui permet 
+    d'automatiser la publication sur les réseaux sociaux. Cette solution révolutionnaire 
+    utilise Claude LLM pour adapter automatiquement votre contenu à chaque plateforme.
+    """,
+    plateformes=[
+        PlatformType.TWITTER,
+        PlatformType.FACEBOOK,
+        PlatformType.LINKEDIN,
+        PlatformType.INSTAGRAM
+    ],
+    hashtags=["#IA", "#ReseauxSociaux", "#Innovation"],
+    lien_source="https://example.com/blog/nouvelle-fonctionnalite"
+)
+
+_TWITTER_REQUEST = PublicationRequest(
+    texte_source="Test rapide pour Twitter uniquement avec un message court et percutant.",
+    plateformes=[PlatformType.TWITTER],
+    hashtags=["#test", "#twitter"]
+)
+
+
+def _json_summary(test_name, result=None, error=None):
+    """Résumé JSON d'un test pour le mode TEST_OUTPUT=json"""
+    if error is not None:
+        return json.dumps({"test": test_name, "error": str(error)})
+    return json.dumps({
+        "test": test_name,
+        "task_id": result["task_id"],
+        "current_step": result["current_step"],
+        "errors": result["errors"],
+        "formatted": {p: str(c) for p, c in result.get("formatted_content", {}).items()},
+    }, default=str, ensure_ascii=False)
+
+
+async def _basic_workflow(out):
+    """Corps de test_basic_workflow: le rapport est ajouté à out"""
+    # Copie de la demande de test (sans nouvelle validation)
+    request = _BASIC_REQUEST.model_copy()
+
+    ts = datetime.now().isoformat(timespec="seconds")
+    plateformes = ", ".join(p.value for p in request.plateformes)
+    out.append(f"Demande créée à {ts}\nPlateformes: {plateformes}")
 
     try:
         # Exécuter le workflow
         result = await orchestrator.execute_workflow(request)
 
-        print(f"\n=== Résultats ===")
-        print(f"ID de tâche: {result['task_id']}")
-        print(f"Étape finale: {result['current_step']}")
-        print(f"Erreurs: {len(result['errors'])}")
+        if STRUCTURED_OUTPUT:
+            out[:] = [_json_summary("basic_workflow", result)]
+            return result
+
+        out.append(f"\n=== Résultats ===")
+        out.append(f"ID de tâche: {result['task_id']}")
+        out.append(f"Étape finale: {result['current_step']}")
+        out.append(f"Erreurs: {len(result['errors'])}")
 
         if result['errors']:
-            print("Erreurs rencontrées:")
+            out.append("Erreurs rencontrées:")
             for error in result['errors']:
-                print(f"  - {error}")
+                out.append(f"  - {error}")
 
         # Afficher le contenu généré
         if result.get('content_generated'):
-            print(f"\n=== Contenu généré ===")
-            print(result['content_generated'])
+            out.append(f"\n=== Contenu généré ===")
+            out.append(str(result['content_generated']))
 
         # Afficher le contenu formaté
         if result.get('formatted_content'):
-            print(f"\n=== Contenu formaté par plateforme ===")
-            for platform, content in result['formatted_content'].items():
-                print(f"\n{platform.upper()}:")
-                print(f"  {content}")
+            out.append("\n=== Contenu formaté par plateforme ===" + "".join(
+                f"\n\n{platform.upper()}:\n  {content}"
+                for platform, content in result['formatted_content'].items()
+            ))
 
         # Afficher les résultats de publication
         if result.get('publication_results'):
-            print(f"\n=== Résultats de publication ===")
-            for platform, pub_result in result['publication_results'].items():
-                print(f"\n{platform.upper()}:")
-                print(f"  Statut: {pub_result.get('status')}")
-                print(f"  ID: {pub_result.get('post_id')}")
-                print(f"  URL: {pub_result.get('post_url')}")
+            out.append("\n=== Résultats de publication ===" + "".join(
+                f"\n\n{platform.upper()}:"
+                f"\n  Statut: {pub_result.get('status')}"
+                f"\n  ID: {pub_result.get('post_id')}"
+                f"\n  URL: {pub_result.get('post_url')}"
+                for platform, pub_result in result['publication_results'].items()
+            ))
 
         return result
 
     except Exception as e:
-        print(f"Erreur lors de l'exécution: {str(e)}")
-        return None
+        out.append(f"Erreur lors de l'exécution: {str(e)}")
+        if STRUCTURED_OUTPUT:
+            out[:] = [_json_summary("basic_workflow", error=e)]
+        return False
 
 
-async def test_single_platform():
-    """Test avec une seule plateforme"""
-    print("\n=== Test plateforme unique (Twitter) ===")
+async def test_basic_workflow():
+    """Test de base du workflow"""
+    out = ["=== Test du workflow de base ==="]
+    return await capture(_basic_workflow(out), out)
 
-    request = PublicationRequest(
-        texte_source="Test rapide pour Twitter uniquement avec un message court et percutant.",
-        plateformes=[PlatformType.TWITTER],
-        hashtags=["#test", "#twitter"]
-    )
+
+async def _single_platform(out):
+    """Corps de test_single_platform: le rapport est ajouté à out"""
+    request = _TWITTER_REQUEST.model_copy()
 
     try:
         result = await orchestrator.execute_workflow(request)
 
-        if result.get('formatted_content') and PlatformType.TWITTER in result['formatted_content']:
-            twitter_content = result['formatted_content'][PlatformType.TWITTER]
-            print(f"Contenu Twitter formaté: {twitter_content}")
+        if STRUCTURED_OUTPUT:
+            out[:] = [_json_summary("single_platform", result)]
+            return result
+
+        # Clés du contenu formaté: "<plateforme>_<type de contenu>"
+        twitter_content = result.get('formatted_content', {}).get('twitter_post')
+        if twitter_content:
+            out.append(f"Contenu Twitter formaté: {twitter_content}")
 
             # Vérifier la longueur
             if hasattr(twitter_content, 'tweet'):
                 tweet_length = len(twitter_content.tweet)
-                print(f"Longueur du tweet: {tweet_length}/280 caractères")
+                out.append(f"Longueur du tweet: {tweet_length}/280 caractères")
                 if tweet_length <= 280:
-                    print("✅ Contrainte de longueur respectée")
+                    out.append("✅ Contrainte de longueur respectée")
                 else:
-                    print("❌ Tweet trop long!")
+                    out.append("❌ Tweet trop long!")
 
         return result
 
     except Exception as e:
-        print(f"Erreur: {str(e)}")
-        return None
+        out.append(f"Erreur: {str(e)}")
+        if STRUCTURED_OUTPUT:
+            out[:] = [_json_summary("single_platform", error=e)]
+        return False
 
 
-async def main():
-    """Fonction principale de test"""
-    print("🚀 Démarrage des tests de l'orchestrateur")
-    print("=" * 50)
+async def test_single_platform():
+    """Test avec une seule plateforme"""
+    out = ["\n=== Test plateforme unique (Twitter) ==="]
+    return await capture(_single_platform(out), out)
 
-    # Test 1: Workflow complet
-    result1 = await test_basic_workflow()
 
-    # Test 2: Plateforme unique
-    result2 = await test_single_platform()
+async def main():
+    """Fonction principale de test"""
+    print("🚀 Démarrage des tests de l'orchestrateur", file=_REPORT)
+    print("=" * 50, file=_REPORT)
+
+    # Tests 1 et 2 (workflow complet, plateforme unique): indépendants, exécutés en parallèle
+    result1, result2 = await asyncio.gather(
+        test_basic_workflow(),
+        test_single_platform(),
+        return_exceptions=True
+    )
 
-    print("\n" + "=" * 50)
-    print("✅ Tests terminés")
+    print("\n" + "=" * 50, file=_REPORT)
+    print("✅ Tests terminés", file=_REPORT)
 
     # Résumé
-    if result1 and result1.get('current_step') == 'completed':
-        print("✅ Test workflow complet: RÉUSSI")
+    for result in (result1, result2):
+        if isinstance(result, Exception):
+            print(f"❌ Erreur: {str(result)}", file=_REPORT)
+
+    if result1 and not isinstance(result1, Exception) and result1.get('current_step') == 'completed':
+        print("✅ Test workflow complet: RÉUSSI", file=_REPORT)
     else:
-        print("❌ Test workflow complet: ÉCHEC")
+        print("❌ Test workflow complet: ÉCHEC", file=_REPORT)
 
-    if result2 and result2.get('current_step') == 'completed':
-        print("✅ Test plateforme unique: RÉUSSI")
+    if result2 and not isinstance(result2, Exception) and result2.get('current_step') == 'completed':
+        print("✅ Test plateforme unique: RÉUSSI", file=_REPORT)
     else:
-        print("❌ Test plateforme unique: ÉCHEC")
+        print("❌ Test plateforme unique: ÉCHEC", file=_REPORT)
 
 
 if __name__ == "__main__":
     # Vérifier que la variable d'environnement ANTHROPIC_API_KEY est définie
     if not os.getenv('ANTHROPIC_API_KEY'):
-        print("❌ Erreur: La variable d'environnement ANTHROPIC_API_KEY n'est pas définie")
-        print("Créez un fichier .env avec votre clé API Anthropic")
+        print("❌ Erreur: La variable d'environnement ANTHROPIC_API_KEY n'est pas définie", file=_REPORT)
+        print("Créez un fichier .env avec votre clé API Anthropic", file=_REPORT)
         sys.exit(1)
 
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("\n⏹️ Tests interrompus par l'utilisateur")
+        print("\n⏹️ Tests interrompus par l'utilisateur", file=_REPORT)
     except Exception as e:
-        print(f"❌ Erreur fatale: {str(e)}")
+        print(f"❌ Erreur fatale: {str(e)}", file=_REPORT)
         sys.exit(1)
\ No newline at end of file
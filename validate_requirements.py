@@ -1,60 +1,294 @@
+import argparse
+import asyncio
+import hashlib
+import json
 import subprocess
-import tempfile
+from collections import deque
+import shutil
 import os
+import re
 import sys
+import urllib.error
+import urllib.request
 from pathlib import Path
 
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.version import InvalidVersion, Version
+except ImportError:
+    Requirement = None
+
 REQUIREMENTS_FILE = "requirements.txt"
+CACHE_ROOT = Path.home() / ".cache" / "validate_requirements"
+ERROR_TAIL_LINES = 200
+MAX_CONCURRENT_CHECKS = 8
+CHECK_CHUNK_SIZE = 10
+HEAVY_PACKAGES = {"torch", "torchvision", "tensorflow", "numpy", "scipy", "opencv-python"}
+MAX_CONCURRENT_PYPI = 16
+PYPI_JSON_URL = "https://pypi.org/pypi/{}/json"
+
+_buf = []
+
+def _make_logger(color):
+    """Logger spécialisé sur une couleur ANSI (désactivée hors terminal), préencodé en UTF-8"""
+    prefix, suffix = (f"\033[{color}m", "\033[0m\n") if sys.stdout.isatty() else ("", "\n")
+    prefix, suffix = prefix.encode(), suffix.encode()
+
+    def log(message):
+        _buf.append(prefix + message.encode("utf-8", "replace") + suffix)
+    return log
+
+log_info = _make_logger(94)
+log_success = _make_logger(92)
+log_error = _make_logger(91)
 
-def log(message, kind="info"):
-    color = {"info": "\033[94m", "success": "\033[92m", "error": "\033[91m", "reset": "\033[0m"}
-    print(f"{color[kind]}{message}{color['reset']}")
+def flush_log(force=False):
+    """Écrit les logs en attente : à chaque bloc sur un terminal, une seule fois en fin de run sinon"""
+    if _buf and (force or sys.stdout.isatty()):
+        # Écriture directe des octets, sans repasser par l'encodage de TextIOWrapper
+        sys.stdout.flush()
+        sys.stdout.buffer.write(b"".join(_buf))
+        sys.stdout.buffer.flush()
+        _buf.clear()
+
+def find_uv(venv_bin):
+    """Retourne le binaire uv (système ou installé dans le venv), None si indisponible"""
+    uv = shutil.which("uv")
+    if uv:
+        return uv
+    result = subprocess.run([venv_bin / "pip", "install", "--quiet", "uv"], capture_output=True)
+    uv = venv_bin / ("uv.exe" if os.name == "nt" else "uv")
+    return uv if result.returncode == 0 and uv.exists() else None
+
+def install_command(venv_bin, uv):
+    """Commande d'installation : uv pip si disponible, sinon pip du venv"""
+    if uv:
+        return [uv, "pip", "install", "--python", venv_bin / "python"]
+    return [venv_bin / "pip", "install"]
+
+def is_heavy(package):
+    """Vrai pour les packages lourds, à résoudre en premier"""
+    name = re.split(r"[\s<>=!~;\[@]", package, maxsplit=1)[0]
+    return re.sub(r"[-_.]+", "-", name).lower() in HEAVY_PACKAGES
+
+async def install_package(venv_bin, packages, uv=None):
+    """Résout les packages (--dry-run) sans les installer : les échecs de build ne sont pas détectés"""
+    # Seules les dernières lignes de sortie sont gardées pour le message d'erreur
+    proc = await asyncio.create_subprocess_exec(
+        *install_command(venv_bin, uv), "--dry-run", *packages,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    tail = deque(maxlen=ERROR_TAIL_LINES)
+    async for line in proc.stdout:
+        tail.append(line)
+    if await proc.wait() == 0:
+        return True, ""
+    return False, b"".join(tail).decode("utf-8", "replace")
 
-def install_package(venv_bin, package):
+def fetch_releases(name):
+    """Versions publiées sur PyPI, None si le projet n'existe pas"""
     try:
-        subprocess.check_output(
-            [venv_bin / "pip", "install", "--no-cache-dir", package],
-            stderr=subprocess.STDOUT,
+        with urllib.request.urlopen(PYPI_JSON_URL.format(name), timeout=10) as response:
+            return set(json.load(response)["releases"])
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            return None
+        raise
+
+def parse_versions(releases):
+    """Versions PEP 440 parmi les releases PyPI, les chaînes héritées non conformes étant ignorées"""
+    for release in releases:
+        try:
+            yield Version(release)
+        except InvalidVersion:
+            continue
+
+async def precheck_pypi(packages):
+    """Rejette sans pip les lignes invalides et les versions absentes de PyPI (index JSON)"""
+    if Requirement is None:
+        return [], packages
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PYPI)
+    loop = asyncio.get_running_loop()
+
+    async def precheck(pkg):
+        try:
+            req = Requirement(pkg)
+        except InvalidRequirement as e:
+            return f"ligne invalide : {e}"
+        if req.url:
+            return None
+        async with semaphore:
+            try:
+                releases = await loop.run_in_executor(None, fetch_releases, req.name)
+            except (OSError, ValueError, KeyError):
+                # PyPI injoignable : la vérification pip tranchera
+                return None
+        if releases is None:
+            return f"projet {req.name} introuvable sur PyPI"
+        if not any(req.specifier.contains(v, prereleases=True) for v in parse_versions(releases)):
+            return f"aucune version publiée ne correspond à {req.specifier}"
+        return None
+
+    errors = await asyncio.gather(*(precheck(pkg) for pkg in packages))
+    rejected = [(pkg, err) for pkg, err in zip(packages, errors) if err]
+    remaining = [pkg for pkg, err in zip(packages, errors) if not err]
+    return rejected, remaining
+
+async def check_packages(venv_bin, packages, uv=None, validated=None):
+    """Vérifie chaque package séparément, au plus MAX_CONCURRENT_CHECKS à la fois
+
+    Les packages présents dans `validated` (déjà résolus seuls) sont sautés ;
+    ceux qui passent y sont ajoutés.
+    """
+    validated = set() if validated is None else validated
+    for pkg in packages:
+        if pkg in validated:
+            log_success(f"💾 {pkg} déjà résolu lors d'une validation précédente")
+    packages = [pkg for pkg in packages if pkg not in validated]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHECKS)
+    failed, packages = await precheck_pypi(packages)
+    for pkg, err in failed:
+        log_error(f"❌ {pkg} : {err}")
+    flush_log()
+
+    async def check(chunk):
+        async with semaphore:
+            ok, err = await install_package(venv_bin, chunk, uv)
+        if ok or len(chunk) == 1:
+            return [(pkg, ok, err) for pkg in chunk]
+        # Lot rejeté : chaque package est revérifié seul pour isoler le fautif
+        results = await asyncio.gather(*(check([pkg]) for pkg in chunk))
+        return [result for chunk_results in results for result in chunk_results]
+
+    packages = sorted(packages, key=lambda pkg: not is_heavy(pkg))
+    chunks = [packages[i:i + CHECK_CHUNK_SIZE] for i in range(0, len(packages), CHECK_CHUNK_SIZE)]
+    for next_result in asyncio.as_completed([check(chunk) for chunk in chunks]):
+        for pkg, ok, err in await next_result:
+            if ok:
+                log_success(f"✅ {pkg}")
+                validated.add(pkg)
+            else:
+                log_error(f"❌ {pkg} : échec de résolution\n{err}")
+                failed.append((pkg, err))
+        flush_log()
+    return failed
+
+def resolve_all(venv_bin, packages, uv=None):
+    """Résout et télécharge tous les packages en une seule passe du resolver"""
+    if uv:
+        # uv n'a pas de --report : les distributions résolues sont listées en " + nom==version"
+        result = subprocess.run(
+            install_command(venv_bin, uv) + ["--dry-run"] + packages,
+            capture_output=True,
         )
-        return True, ""
-    except subprocess.CalledProcessError as e:
-        return False, e.output.decode()
+        if result.returncode != 0:
+            return None, result.stderr.decode()
+        lines = result.stderr.decode().splitlines()
+        return [line.split()[1] for line in lines if line.startswith(" + ")], ""
+
+    result = subprocess.run(
+        [venv_bin / "pip", "install", "--dry-run", "--quiet",
+         "--report", "-"] + packages,
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        return None, result.stderr.decode()
+    report = json.loads(result.stdout)
+    return [item["metadata"]["name"] for item in report.get("install", [])], ""
+
+def venv_cache_dir():
+    """Répertoire du venv persistant, indexé par le hash de requirements.txt et la version de Python"""
+    digest = hashlib.sha256(Path(REQUIREMENTS_FILE).read_bytes() + sys.version.encode())
+    return CACHE_ROOT / digest.hexdigest()
+
+def validated_packages_file():
+    """Lignes de requirements déjà résolues, partagées entre versions de requirements.txt pour une même version de Python"""
+    return CACHE_ROOT / f"validated-{hashlib.sha256(sys.version.encode()).hexdigest()[:16]}.txt"
+
+def load_validated():
+    """Lignes déjà résolues lors des validations précédentes, ensemble vide si aucun cache"""
+    try:
+        return set(validated_packages_file().read_text().splitlines())
+    except OSError:
+        return set()
+
+def save_validated(validated):
+    """Enregistre les lignes résolues pour les sauter lors de la prochaine validation"""
+    try:
+        validated_packages_file().write_text("\n".join(sorted(validated)))
+    except OSError:
+        # Cache non inscriptible : la prochaine exécution revérifiera simplement tout
+        pass
 
 def main():
+    parser = argparse.ArgumentParser(description=f"Valide les packages de {REQUIREMENTS_FILE}")
+    parser.add_argument("--force", action="store_true", help="Reconstruit le venv en cache et revérifie tous les packages")
+    args = parser.parse_args()
+
+    # Chaque processus pip interroge PyPI pour sa propre version : une requête réseau inutile par package
+    os.environ.setdefault("PIP_DISABLE_PIP_VERSION_CHECK", "1")
     if not Path(REQUIREMENTS_FILE).exists():
-        log(f"Fichier {REQUIREMENTS_FILE} introuvable.", "error")
+        log_error(f"Fichier {REQUIREMENTS_FILE} introuvable.")
         sys.exit(1)
 
     with open(REQUIREMENTS_FILE) as f:
-        packages = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        # Lignes dupliquées dédoublonnées, ordre conservé
+        packages = list(dict.fromkeys(line.strip() for line in f if line.strip() and not line.startswith("#")))
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmp_path = Path(tmpdir)
-        subprocess.run([sys.executable, "-m", "venv", tmp_path], check=True)
+    venv_dir = venv_cache_dir()
+    venv_bin = venv_dir / ("Scripts" if os.name == "nt" else "bin")
+    marker = venv_dir / ".validated"
 
-        venv_bin = tmp_path / ("Scripts" if os.name == "nt" else "bin")
+    if args.force:
+        if venv_dir.exists():
+            shutil.rmtree(venv_dir)
+        validated_packages_file().unlink(missing_ok=True)
 
+    if marker.exists():
+        log_success(f"💾 {REQUIREMENTS_FILE} inchangé depuis la dernière validation ({venv_dir})")
+        log_success("\n🎉 Tous les packages ont été résolus correctement")
+        return
+
+    if not (venv_bin / "python").exists() and not (venv_bin / "python.exe").exists():
+        subprocess.run([sys.executable, "-m", "venv", venv_dir], check=True)
         subprocess.run([venv_bin / "pip", "install", "--upgrade", "pip"], check=True)
+    else:
+        log_info(f"♻️  Réutilisation du venv {venv_dir}")
 
-        log(f"🧪 Test de {len(packages)} packages depuis {REQUIREMENTS_FILE}\n")
+    uv = find_uv(venv_bin)
+    log_info(f"⚡ Installeur : {'uv' if uv else 'pip'}")
 
-        failed = []
+    log_info(f"🧪 Test de {len(packages)} packages depuis {REQUIREMENTS_FILE}\n")
+    flush_log()
 
-        for pkg in packages:
-            log(f"➡️  {pkg}")
-            ok, err = install_package(venv_bin, pkg)
-            if ok:
-                log(f"   ✅ Installé avec succès", "success")
-            else:
-                log(f"   ❌ Échec d'installation\n{err}", "error")
-                failed.append((pkg, err))
+    failed = []
+    validated = load_validated()
 
-        if failed:
-            log("\n🚨 Packages en échec :", "error")
-            for pkg, err in failed:
-                log(f" - {pkg}", "error")
-        else:
-            log("\n🎉 Tous les packages ont été installés correctement", "success")
+    resolved, err = resolve_all(venv_bin, packages, uv) if packages else ([], "")
+    if resolved is not None:
+        log_success(f"✅ {len(resolved)} distributions résolues en une passe")
+        validated.update(packages)
+    else:
+        # Le resolver a rejeté l'ensemble : on isole les packages fautifs en parallèle
+        log_error(f"❌ Échec de la résolution groupée\n{err}")
+        failed = asyncio.run(check_packages(venv_bin, packages, uv, validated))
+        if not failed:
+            # Chaque package passe seul : le conflit vient de leur combinaison
+            log_error("❌ Aucun package fautif isolé : conflit entre requirements")
+            failed = [("résolution groupée (conflit entre requirements)", err)]
+    save_validated(validated)
+
+    if failed:
+        log_error("\n🚨 Packages en échec :")
+        for pkg, err in failed:
+            log_error(f" - {pkg}")
+    else:
+        marker.touch()
+        log_success("\n🎉 Tous les packages ont été résolus correctement")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        flush_log(force=True)